@@ -0,0 +1,476 @@
+import argparse
+import contextlib
+import gc
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from bank_management_system import Account, Bank, Customer, Ledger, ShardedBank, VelocityEngine, VelocityRule
+
+class LegacyAccount:
+    """The Account before the ledger: one formatted string per transaction."""
+
+    def __init__(self, balance=0):
+        self.transactions = []
+        self.balance = balance
+
+    def deposit(self, amount):
+        self.balance += amount
+        self.transactions.append(f"Deposit: +{amount} (New balance: {self.balance})")
+        print(f"Deposited {amount}. New balance: {self.balance}")
+
+    def withdraw(self, amount):
+        self.balance -= amount
+        self.transactions.append(f"Withdrawal: -{amount} (New balance: {self.balance})")
+        print(f"Withdrew {amount}. New balance: {self.balance}")
+
+def make_amounts(count: int, seed: int = 11):
+    rng = random.Random(seed)
+    return [(rng.random() < 0.6, round(rng.uniform(1, 500), 2)) for _ in range(count)]
+
+def quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+def bench_ledger(sizes):
+    print("\n--- Account history: formatted strings vs array-backed ledger ---")
+    print(f"{'Entries':>10} {'Layout':>8} {'Append':>8} {'Bytes/entry':>12} {'History':>8}")
+    for size in sizes:
+        amounts = make_amounts(size)
+        results = {}
+        for layout in ('strings', 'ledger'):
+            account = LegacyAccount(1_000_000) if layout == 'strings' else Account(1, "Bench", 1_000_000)
+            gc.collect()
+            tracemalloc.start()
+            start = time.perf_counter()
+            with quiet():
+                for is_deposit, amount in amounts:
+                    if is_deposit:
+                        account.deposit(amount)
+                    else:
+                        account.withdraw(amount)
+            append_time = time.perf_counter() - start
+            used = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            start = time.perf_counter()
+            history = account.transactions if layout == 'strings' else account.get_transaction_history()
+            history_time = time.perf_counter() - start
+            results[layout] = (account.balance, history)
+            print(f"{size:>10,} {layout:>8} {append_time:>7.2f}s {used / size:>12.1f} {history_time:>7.2f}s")
+        assert results['strings'] == results['ledger'], "ledger history differs from the formatted strings"
+    print("Both layouts end on the same balance and produce identical history lines.")
+
+def populated_bank(accounts: int, balance=1_000):
+    bank = Bank("Bench Bank")
+    with quiet():
+        for i in range(accounts):
+            customer = Customer(f"C{i:07d}", f"Customer {i}", "1 Bench St")
+            bank.add_customer(customer)
+            bank.create_account(customer.customer_id, balance)
+    return bank
+
+def bench_concurrent_transfers(accounts: int, transfers: int, threads):
+    print(f"\n--- Concurrent transfer_funds across {accounts:,} accounts ---")
+    print(f"{'Threads':>8} {'Transfers':>10} {'Succeeded':>10} {'Seconds':>8} {'Per second':>11}")
+    # Switch threads far more often than the default so unsafe interleavings would surface.
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        for thread_count in threads:
+            # Few, small balances make contention and insufficient-funds races likely.
+            bank = populated_bank(accounts, balance=100)
+            numbers = list(bank.accounts)
+            expected_total = sum(account.balance for account in bank.accounts.values())
+            succeeded = [0] * thread_count
+
+            def worker(index):
+                rng = random.Random(index)
+                for _ in range(transfers // thread_count):
+                    source, target = rng.sample(numbers, 2)
+                    if bank.transfer_funds(source, target, rng.randint(1, 80)):
+                        succeeded[index] += 1
+
+            workers = [threading.Thread(target=worker, args=(i,)) for i in range(thread_count)]
+            start = time.perf_counter()
+            with quiet():
+                for thread in workers:
+                    thread.start()
+                for thread in workers:
+                    thread.join()
+            elapsed = time.perf_counter() - start
+            balances = [account.balance for account in bank.accounts.values()]
+            assert sum(balances) == expected_total, "money was created or destroyed"
+            assert min(balances) >= 0, "an account was overdrawn"
+            for account in bank.accounts.values():
+                replayed = account.ledger.opening_balance
+                for entry in account.ledger:
+                    replayed += entry.amount if entry.kind in ('deposit', 'transfer_in') else -entry.amount
+                assert replayed == account.balance, "ledger disagrees with the balance"
+            done = transfers // thread_count * thread_count
+            print(f"{thread_count:>8} {done:>10,} {sum(succeeded):>10,} {elapsed:>7.2f}s {done / elapsed:>11,.0f}")
+    finally:
+        sys.setswitchinterval(switch_interval)
+    print("Total money is conserved, no account is overdrawn, and every ledger replays to its balance.")
+
+def bench_settlement(accounts: int, sizes):
+    print(f"\n--- End-of-day settlement across {accounts:,} accounts: transfer_funds loop vs settle_transfers ---")
+    print(f"{'Transfers':>10} {'Loop':>8} {'Settle':>8} {'Loop/s':>10} {'Settle/s':>10}")
+    for size in sizes:
+        rng = random.Random(size)
+        looped, settled = populated_bank(accounts, balance=10_000_000), populated_bank(accounts, balance=10_000_000)
+        numbers = list(looped.accounts)
+        transfers = [(*rng.sample(numbers, 2), rng.randint(1, 5_000)) for _ in range(size)]
+        start = time.perf_counter()
+        with quiet():
+            for from_account_num, to_account_num, amount in transfers:
+                looped.transfer_funds(from_account_num, to_account_num, amount)
+        loop_time = time.perf_counter() - start
+        start = time.perf_counter()
+        with quiet():
+            assert settled.settle_transfers(transfers)
+        settle_time = time.perf_counter() - start
+        for number, account in looped.accounts.items():
+            other = settled.accounts[number]
+            assert account.balance == other.balance, "settlement balance differs from the loop"
+            assert len(account.ledger) == len(other.ledger), "settlement must record every transfer"
+        print(f"{size:>10,} {loop_time:>7.2f}s {settle_time:>7.2f}s {size / loop_time:>10,.0f} {size / settle_time:>10,.0f}")
+    print("Both paths end with identical balances and one ledger entry per transfer side.")
+
+def bench_durable_ops(threads: int, operations: int, windows):
+    print(f"\n--- Durable deposits/withdrawals from {threads} threads: group-commit window vs throughput ---")
+    print(f"{'Window':>8} {'Ops':>8} {'Seconds':>8} {'Ops/s':>9} {'Recovery':>9}")
+    for window in [None] + list(windows):
+        directory = None if window is None else tempfile.mkdtemp()
+        with quiet():
+            bank = Bank("Bench Bank", directory, group_commit_window=window or 0)
+            for i in range(100):
+                bank.add_customer(Customer(f"C{i:03d}", f"Customer {i}", "1 Bench St"))
+                bank.create_account(f"C{i:03d}", 1_000)
+        numbers = list(bank.accounts)
+
+        def worker(index):
+            rng = random.Random(index)
+            for _ in range(operations // threads):
+                account = bank.accounts[rng.choice(numbers)]
+                if rng.random() < 0.5:
+                    account.deposit(rng.randint(1, 100))
+                else:
+                    account.withdraw(rng.randint(1, 100))
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        start = time.perf_counter()
+        with quiet():
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+        elapsed = time.perf_counter() - start
+        done = operations // threads * threads
+        recovery = "-"
+        if directory is not None:
+            # Reopen without close(): recovery must rebuild every acknowledged operation.
+            start = time.perf_counter()
+            with quiet():
+                recovered = Bank("Bench Bank", directory)
+            recovery = f"{time.perf_counter() - start:.2f}s"
+            assert {number: account.balance for number, account in recovered.accounts.items()} == \
+                {number: account.balance for number, account in bank.accounts.items()}, "recovery lost operations"
+            recovered.close()
+            bank.close()
+        label = "memory" if window is None else f"{window * 1000:g}ms"
+        print(f"{label:>8} {done:>8,} {elapsed:>7.2f}s {done / elapsed:>9,.0f} {recovery:>9}")
+    print("Every durable run recovers to the same balances; 'memory' is the in-memory bank.")
+
+CRASH_THREADS = 8
+CRASH_ACCOUNTS_PER_THREAD = 4
+
+def crash_writer(directory: str):
+    # Child process for bench_crash_recovery: every thread owns its own
+    # accounts and reports each operation on stdout once it is acknowledged,
+    # until the parent kills the process.
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        bank = Bank("Crash Bank", directory, group_commit_window=0.0005, snapshot_every=2_000)
+        owned = []
+        for thread in range(CRASH_THREADS):
+            bank.add_customer(Customer(f"T{thread}", f"Thread {thread}", "1 Crash St"))
+            owned.append([bank.create_account(f"T{thread}", 1_000).account_number
+                          for _ in range(CRASH_ACCOUNTS_PER_THREAD)])
+
+    def worker(thread):
+        rng = random.Random(thread)
+        numbers = owned[thread]
+        balances = {number: 1_000 for number in numbers}
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            while True:
+                number = rng.choice(numbers)
+                amount = rng.randint(1, 200)
+                choice = rng.random()
+                if choice < 0.4:
+                    bank.accounts[number].deposit(amount)
+                    balances[number] += amount
+                    ack = f"deposit {number} {amount}"
+                elif choice < 0.7 and balances[number] >= amount:
+                    bank.accounts[number].withdraw(amount)
+                    balances[number] -= amount
+                    ack = f"withdraw {number} {amount}"
+                else:
+                    target = rng.choice([other for other in numbers if other != number])
+                    if not bank.transfer_funds(number, target, amount):
+                        continue
+                    balances[number] -= amount
+                    balances[target] += amount
+                    ack = f"transfer {number} {amount} {target}"
+                os.write(sys.__stdout__.fileno(), f"{ack}\n".encode('ascii'))
+
+    sys.__stdout__.write("ready\n")
+    sys.__stdout__.flush()
+    for thread in range(CRASH_THREADS):
+        threading.Thread(target=worker, args=(thread,), daemon=True).start()
+    threading.Event().wait()
+
+def bench_crash_recovery(acknowledged: int):
+    print(f"\n--- Crash recovery: SIGKILL a durable writer after {acknowledged:,} acknowledged operations ---")
+    directory = tempfile.mkdtemp()
+    writer = subprocess.Popen([sys.executable, "-c", f"import bank_benchmark; bank_benchmark.crash_writer({directory!r})"],
+                              cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.PIPE)
+    assert writer.stdout.readline() == b"ready\n", "crash writer did not start"
+    acks = []
+    for line in writer.stdout:
+        acks.append(line.split())
+        if len(acks) == acknowledged:
+            writer.kill()  # mid-batch: other threads are still appending
+            break
+    writer.wait()
+    acks.extend(line.split() for line in writer.stdout.read().splitlines())
+    # Simulate a crash in the middle of writing a record as well.
+    with open(os.path.join(directory, 'bank.wal'), 'ab') as f:
+        f.write(b'999999999 {"op":"deposit","acc')
+
+    expected = {}
+    for ack in acks:
+        op, number, amount = ack[0].decode(), int(ack[1]), int(ack[2])
+        if op == 'deposit':
+            expected.setdefault(number, []).append(('deposit', amount, 0))
+        elif op == 'withdraw':
+            expected.setdefault(number, []).append(('withdrawal', amount, 0))
+        else:
+            target = int(ack[3])
+            expected.setdefault(number, []).append(('transfer_out', amount, target))
+            expected.setdefault(target, []).append(('transfer_in', amount, number))
+    start = time.perf_counter()
+    with quiet():
+        recovered = Bank("Crash Bank", directory)
+    recovery = time.perf_counter() - start
+    unacknowledged = 0
+    for number, account in recovered.accounts.items():
+        entries = [(entry.kind, entry.amount, entry.counterparty) for entry in account.ledger]
+        wanted = expected.get(number, [])
+        assert entries[:len(wanted)] == wanted, f"account {number} lost or reordered acknowledged entries"
+        unacknowledged += len(entries) - len(wanted)
+        replayed = account.ledger.opening_balance
+        for kind, amount, _ in entries:
+            replayed += amount if kind in ('deposit', 'transfer_in') else -amount
+        assert replayed == account.balance, "ledger disagrees with the balance"
+
+    # The torn tail must not swallow records written after the restart.
+    with quiet():
+        recovered.accounts[min(recovered.accounts)].deposit(1)
+        balances = {number: account.balance for number, account in recovered.accounts.items()}
+        recovered.close()
+        reopened = Bank("Crash Bank", directory)
+    assert {number: account.balance for number, account in reopened.accounts.items()} == balances, \
+        "an operation written after recovery was lost"
+    reopened.close()
+    print(f"{len(acks):,} acknowledged operations all recovered in {recovery:.2f}s, plus {unacknowledged} "
+          f"ledger entries that were durable but not yet acknowledged when the writer died.")
+
+def bench_statements(entries: int, accounts: int = 100_000, per_account: int = 40):
+    print("\n--- Point-in-time balances and month-end statements from ledger checkpoints ---")
+    year_start = datetime(2024, 1, 1).timestamp()
+    step = 366 * 86_400 / entries
+    rng = random.Random(3)
+    account = Account(1, "Bench", 1_000_000)
+    for i in range(entries):
+        amount = rng.randint(1, 500)
+        if rng.random() < 0.5:
+            account._credit(amount, timestamp=year_start + i * step)
+        else:
+            account._debit(amount, timestamp=year_start + i * step)
+    month_ends = [datetime(2024, month, 1) for month in range(2, 13)] + [datetime(2025, 1, 1)]
+    start = time.perf_counter()
+    balances = [account.balance_at(when) for when in month_ends]
+    lookup_time = (time.perf_counter() - start) / len(month_ends)
+    start = time.perf_counter()
+    replayed = []
+    for when in month_ends:
+        balance = account.ledger.opening_balance
+        for entry in account.ledger:
+            if entry.timestamp > when.timestamp():
+                break
+            balance += entry.amount if entry.kind in ('deposit', 'transfer_in') else -entry.amount
+        replayed.append(balance)
+    replay_time = (time.perf_counter() - start) / len(month_ends)
+    assert balances == replayed, "checkpointed balance differs from a full replay"
+    start = time.perf_counter()
+    lines = sum(1 for _ in account.statement(datetime(2024, 3, 1), datetime(2024, 4, 1)))
+    statement_time = time.perf_counter() - start
+    print(f"One account, {entries:,} entries: balance_at {lookup_time * 1e6:,.0f}us vs full replay "
+          f"{replay_time * 1000:,.0f}ms; March statement ({lines:,} entries) streamed in {statement_time * 1000:.0f}ms")
+
+    ledgers = []
+    for _ in range(accounts):
+        ledger = Ledger(1_000)
+        for timestamp in sorted(year_start + rng.random() * 86_400 * 365 for _ in range(per_account)):
+            ledger.append('deposit' if rng.random() < 0.5 else 'withdrawal', rng.randint(1, 20), timestamp=timestamp)
+        ledgers.append(ledger)
+    march_end = datetime(2024, 4, 1).timestamp()
+    start = time.perf_counter()
+    for ledger in ledgers:
+        ledger.balance_at(march_end)
+    print(f"Month-end balance for {accounts:,} accounts ({per_account} entries each): "
+          f"{time.perf_counter() - start:.2f}s")
+
+def bench_sharding(shard_counts, accounts: int, operations: int, batch: int = 2_000):
+    print(f"\n--- ShardedBank across worker processes ({os.cpu_count()} CPUs available), "
+          f"{accounts:,} accounts, batches of {batch:,} ---")
+    print(f"{'Shards':>7} {'Ops':>9} {'Ops/s':>9} {'Transfers':>10} {'Cross-shard':>12} {'Transfers/s':>12}")
+    for shards in shard_counts:
+        rng = random.Random(shards)
+        bank = ShardedBank("Bench Bank", shards=shards)
+        with quiet():
+            numbers = []
+            for i in range(accounts):
+                bank.add_customer(Customer(f"C{i:07d}", f"Customer {i}", "1 Bench St"))
+                numbers.append(bank.create_account(f"C{i:07d}", 1_000))
+        ops = [('deposit' if rng.random() < 0.5 else 'withdraw', rng.choice(numbers), rng.randint(1, 100))
+               for _ in range(operations)]
+        start = time.perf_counter()
+        for offset in range(0, operations, batch):
+            bank.apply_batch(ops[offset:offset + batch])
+        ops_time = time.perf_counter() - start
+        expected_total = sum(bank.get_balance(number) for number in numbers)
+        transfers = [(*rng.sample(numbers, 2), rng.randint(1, 100)) for _ in range(operations)]
+        cross = sum(bank.shard_of(source) != bank.shard_of(target) for source, target, _ in transfers)
+        start = time.perf_counter()
+        for offset in range(0, operations, batch):
+            bank.transfer_many(transfers[offset:offset + batch])
+        transfer_time = time.perf_counter() - start
+        balances = [bank.get_balance(number) for number in numbers]
+        assert sum(balances) == expected_total, "money was created or destroyed"
+        assert min(balances) >= 0, "an account was overdrawn"
+        bank.close()
+        print(f"{shards:>7} {operations:>9,} {operations / ops_time:>9,.0f} {operations:>10,} "
+              f"{cross / operations:>11.0%} {operations / transfer_time:>12,.0f}")
+    print("Transfers conserve total money and leave no account overdrawn at every shard count; "
+          "scaling needs one free core per shard.")
+
+def bench_velocity(accounts: int, operations: int, rate: int = 100_000):
+    print(f"\n--- Velocity rules on withdraw/transfer_funds: per-transaction overhead ---")
+    # Limits sized for busy business accounts, so the timed runs measure the
+    # checks rather than the cheaper blocked path.
+    rules = [VelocityRule("500 debits per minute", 60, max_count=500),
+             VelocityRule("100k out per hour", 3600, max_amount=100_000, buckets=60),
+             VelocityRule("2k transfers per day", 86_400, max_count=2_000, kinds=('transfer_out',), buckets=24)]
+    print(f"{'Rules':>6} {'Withdraw':>10} {'Transfer':>10} {'Blocked':>8}")
+    timings = {}
+    for rule_set in ((), rules):
+        rng = random.Random(5)
+        with quiet():
+            bank = Bank("Bench Bank", velocity_rules=rule_set)
+            for i in range(accounts):
+                bank.add_customer(Customer(f"C{i:07d}", f"Customer {i}", "1 Bench St"))
+                bank.create_account(f"C{i:07d}", 1_000_000)
+        numbers = list(bank.accounts)
+        withdrawals = [(bank.accounts[rng.choice(numbers)], rng.randint(1, 100)) for _ in range(operations)]
+        transfers = [(*rng.sample(numbers, 2), rng.randint(1, 100)) for _ in range(operations)]
+        with quiet():
+            start = time.perf_counter()
+            for account, amount in withdrawals:
+                account.withdraw(amount)
+            withdraw_time = (time.perf_counter() - start) / operations
+            start = time.perf_counter()
+            for from_account_num, to_account_num, amount in transfers:
+                bank.transfer_funds(from_account_num, to_account_num, amount)
+            transfer_time = (time.perf_counter() - start) / operations
+        blocked = sum(bank.velocity.blocked.values()) if rule_set else 0
+        timings[len(rule_set)] = (withdraw_time, transfer_time)
+        print(f"{len(rule_set):>6} {withdraw_time * 1e6:>8.2f}us {transfer_time * 1e6:>8.2f}us {blocked:>8,}")
+    withdraw_overhead = timings[len(rules)][0] - timings[0][0]
+    transfer_overhead = timings[len(rules)][1] - timings[0][1]
+    print(f"Rule overhead: {withdraw_overhead * 1e6:.2f}us per withdrawal, {transfer_overhead * 1e6:.2f}us per "
+          f"transfer, i.e. {max(withdraw_overhead, transfer_overhead) * rate:.1%} of one core at {rate:,} tx/s.")
+
+    # Simulated clock at `rate` events per second across the accounts, so the
+    # windows slide and expire buckets as they would under that load.
+    engine = VelocityEngine(rules)
+    events = [(rng.choice(numbers), rng.randint(1, 100)) for _ in range(operations)]
+    start = time.perf_counter()
+    for index, (account_number, amount) in enumerate(events):
+        engine.check(account_number, 'withdrawal', amount, index / rate)
+    check_time = (time.perf_counter() - start) / operations
+    print(f"VelocityEngine.check alone at a simulated {rate:,} tx/s: {check_time * 1e6:.2f}us per event, "
+          f"{sum(engine.blocked.values()):,} blocked")
+
+def bench_offboarding(customers: int, closures: int):
+    print(f"\n--- Offboarding {closures:,} of {customers:,} customers (2 accounts each), durable bank ---")
+    print(f"{'Path':>16} {'Seconds':>8} {'Customers/s':>12} {'Log bytes':>10} {'Recovery':>9}")
+    for path in ('remove_customer', 'remove_customers'):
+        directory = tempfile.mkdtemp()
+        with quiet():
+            bank = Bank("Bench Bank", directory, snapshot_every=10 ** 9)
+            for i in range(customers):
+                customer = Customer(f"C{i:07d}", f"Customer {i}", "1 Bench St")
+                bank.add_customer(customer)
+                bank.create_account(customer.customer_id, 1_000).deposit(10)
+                bank.create_account(customer.customer_id, 500)
+            bank.snapshot()
+        leaving = [f"C{i:07d}" for i in random.Random(7).sample(range(customers), closures)]
+        start = time.perf_counter()
+        with quiet():
+            if path == 'remove_customer':
+                for customer_id in leaving:
+                    bank.remove_customer(customer_id)
+            else:
+                bank.remove_customers(leaving)
+        elapsed = time.perf_counter() - start
+        log_bytes = os.path.getsize(os.path.join(directory, 'bank.wal'))
+        start = time.perf_counter()
+        with quiet():
+            recovered = Bank("Bench Bank", directory)
+        recovery = time.perf_counter() - start
+        assert set(recovered.accounts) == set(bank.accounts), "recovery disagrees on open accounts"
+        assert len(recovered.closed_accounts) == 2 * closures, "closed accounts were not kept"
+        assert all(len(account.ledger) == 1 for number, account in recovered.closed_accounts.items()
+                   if number % 2), "a closed account lost its ledger"
+        recovered.close()
+        bank.close()
+        print(f"{path:>16} {elapsed:>7.2f}s {closures / elapsed:>12,.0f} {log_bytes:>10,} {recovery:>8.2f}s")
+    print("Closed accounts keep their ledgers and are rebuilt as tombstones on recovery.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Bank Management System benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--accounts", type=int, default=1_000)
+    parser.add_argument("--transfers", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--shards", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+    bench_ledger(args.sizes)
+    bench_concurrent_transfers(args.accounts, args.transfers, args.threads)
+    bench_settlement(10 * args.accounts, [args.transfers // 4, args.transfers])
+    bench_durable_ops(16, 20_000, [0, 0.0005, 0.002])
+    bench_crash_recovery(5_000)
+    bench_statements(max(args.sizes))
+    bench_sharding(args.shards, args.accounts, args.transfers)
+    bench_velocity(10 * args.accounts, args.transfers)
+    bench_offboarding(20 * args.accounts, 5 * args.accounts)
+
+if __name__ == "__main__":
+    main()
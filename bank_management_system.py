@@ -1,34 +1,518 @@
+import base64
+import bisect
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import time
+from array import array
+from collections import namedtuple
+from datetime import datetime
+
+LedgerEntry = namedtuple('LedgerEntry', 'kind amount timestamp counterparty')
+
+def _to_timestamp(when):
+    return when.timestamp() if isinstance(when, datetime) else when
+
+class Ledger:
+    """Append-only account history kept as parallel arrays.
+
+    Each entry costs about 25 bytes instead of one formatted string per
+    transaction. Every CHECKPOINT_EVERY entries the running balance is
+    remembered, so the balance at any entry or time is a checkpoint plus a
+    short replay.
+    """
+
+    KINDS = ('deposit', 'withdrawal', 'transfer_in', 'transfer_out')
+    _KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+    _CREDITS = frozenset(('deposit', 'transfer_in'))
+    NO_COUNTERPARTY = 0
+    CHECKPOINT_EVERY = 256
+    # Set in the kind code when the amount was an int, so it reads back as one.
+    _INTEGER = 0x80
+    _COLUMNS = ('kinds', 'amounts', 'timestamps', 'counterparties')
+    _CHUNK = 4096  # entries copied out of the arrays at a time when streaming
+
+    def __init__(self, opening_balance=0):
+        self.opening_balance = opening_balance
+        self.balance = opening_balance  # after the last entry
+        self.checkpoints = []  # balance before entry i * CHECKPOINT_EVERY
+        self.kinds = array('B')
+        self.amounts = array('d')
+        self.timestamps = array('d')
+        self.counterparties = array('q')
+
+    def append(self, kind, amount, counterparty=NO_COUNTERPARTY, timestamp=None):
+        if len(self.kinds) % self.CHECKPOINT_EVERY == 0:
+            self.checkpoints.append(self.balance)
+        code = self._KIND_CODES[kind]
+        self.kinds.append(code | self._INTEGER if isinstance(amount, int) else code)
+        self.amounts.append(amount)
+        if timestamp is None:
+            timestamp = time.time()
+        # The wall clock can step backwards (NTP), but index_at and statement
+        # bisect on timestamps, so keep them non-decreasing.
+        if self.timestamps and timestamp < self.timestamps[-1]:
+            timestamp = self.timestamps[-1]
+        self.timestamps.append(timestamp)
+        self.counterparties.append(counterparty)
+        if kind in self._CREDITS:
+            self.balance += amount
+        else:
+            self.balance -= amount
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def to_columns(self):
+        return {name: base64.b64encode(getattr(self, name).tobytes()).decode('ascii') for name in self._COLUMNS}
+
+    @classmethod
+    def from_columns(cls, opening_balance, columns):
+        ledger = cls(opening_balance)
+        for name in cls._COLUMNS:
+            getattr(ledger, name).frombytes(base64.b64decode(columns[name]))
+        # Rebuild the running balance and checkpoints in one pass.
+        balance = opening_balance
+        for index, entry in enumerate(ledger.entries()):
+            if index % cls.CHECKPOINT_EVERY == 0:
+                ledger.checkpoints.append(balance)
+            balance += entry.amount if entry.kind in cls._CREDITS else -entry.amount
+        ledger.balance = balance
+        return ledger
+
+    def truncate(self, length):
+        """Drop entries from `length` on.
+
+        Only for rolling back entries nobody has seen yet; the caller holds
+        the account lock.
+        """
+        self.balance = self.balance_before(length)
+        del self.kinds[length:]
+        del self.amounts[length:]
+        del self.timestamps[length:]
+        del self.counterparties[length:]
+        del self.checkpoints[-(-length // self.CHECKPOINT_EVERY):]
+
+    def entries(self, start=0, stop=None):
+        """Yield LedgerEntry tuples for entries [start, stop) without copying the whole ledger."""
+        stop = len(self.kinds) if stop is None else min(stop, len(self.kinds))
+        kinds = self.KINDS
+        for chunk_start in range(start, stop, self._CHUNK):
+            chunk_stop = min(chunk_start + self._CHUNK, stop)
+            for code, amount, timestamp, counterparty in zip(self.kinds[chunk_start:chunk_stop],
+                                                             self.amounts[chunk_start:chunk_stop],
+                                                             self.timestamps[chunk_start:chunk_stop],
+                                                             self.counterparties[chunk_start:chunk_stop]):
+                if code & self._INTEGER:
+                    yield LedgerEntry(kinds[code ^ self._INTEGER], int(amount), timestamp, counterparty)
+                else:
+                    yield LedgerEntry(kinds[code], amount, timestamp, counterparty)
+
+    def __iter__(self):
+        return self.entries()
+
+    def balance_before(self, index):
+        """Return the balance after the first `index` entries.
+
+        Starts from the nearest checkpoint and replays fewer than
+        CHECKPOINT_EVERY entries.
+        """
+        block = index // self.CHECKPOINT_EVERY
+        if block >= len(self.checkpoints):
+            return self.balance
+        balance = self.checkpoints[block]
+        for entry in self.entries(block * self.CHECKPOINT_EVERY, index):
+            balance += entry.amount if entry.kind in self._CREDITS else -entry.amount
+        return balance
+
+    def index_at(self, timestamp):
+        """Return the number of entries recorded at or before `timestamp`.
+
+        append keeps timestamps non-decreasing, so this is a bisection.
+        """
+        return bisect.bisect_right(self.timestamps, timestamp)
+
+    def balance_at(self, timestamp):
+        return self.balance_before(self.index_at(timestamp))
+
+    def statement(self, start_time, end_time):
+        """Yield (entry, balance after it) for entries with start_time <= timestamp < end_time."""
+        start = bisect.bisect_left(self.timestamps, start_time)
+        stop = bisect.bisect_left(self.timestamps, end_time)
+        balance = self.balance_before(start)
+        for entry in self.entries(start, stop):
+            balance += entry.amount if entry.kind in self._CREDITS else -entry.amount
+            yield entry, balance
+
+    def history(self, start=0, stop=None):
+        """Rebuild the human-readable lines for entries [start, stop)."""
+        balance = self.balance_before(start)
+        for entry in self.entries(start, stop):
+            if entry.kind in self._CREDITS:
+                balance += entry.amount
+                sign = '+'
+            else:
+                balance -= entry.amount
+                sign = '-'
+            if entry.kind == 'deposit':
+                label = "Deposit"
+            elif entry.kind == 'withdrawal':
+                label = "Withdrawal"
+            elif entry.kind == 'transfer_in':
+                label = f"Transfer from {entry.counterparty}"
+            else:
+                label = f"Transfer to {entry.counterparty}"
+            yield f"{label}: {sign}{entry.amount} (New balance: {balance})"
+
+class _WriteAheadLog:
+    """Log of bank operations, one "<sequence> <json>" line each, with group commit.
+
+    Callers append while holding their account locks, then wait outside them
+    until a background thread has written and fsynced a batch that contains
+    their record. Records arriving during an fsync share the next one; a
+    `window` in seconds additionally holds each batch open, which only pays
+    off when fsync takes longer than the window.
+    """
+
+    def __init__(self, path, window, last_sequence=0, on_full=None, full_after=0, valid_length=None):
+        self.path = path
+        self.window = window
+        self.records = 0  # records appended since the last checkpoint
+        self._on_full = on_full
+        self._full_after = full_after
+        self._file = open(path, 'ab')
+        if valid_length is not None and self._file.tell() > valid_length:
+            # Cut off a torn tail left by a crash, so new records start on a
+            # line of their own instead of being glued onto the partial one.
+            self._file.truncate(valid_length)
+            self._file.seek(valid_length)
+            os.fsync(self._file.fileno())
+        self._lock = threading.Lock()
+        self._has_pending = threading.Condition(self._lock)
+        self._durable_changed = threading.Condition(self._lock)
+        self._io_lock = threading.Lock()  # held while writing the file
+        self._pending = []
+        self._appended = self._durable = last_sequence
+        self._closed = False
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def read(path, after_sequence):
+        """Return the logged (sequence, record) pairs newer than after_sequence.
+
+        Also returns the byte length of the log up to its last complete
+        record; reading stops at a torn tail.
+        """
+        records = []
+        valid_length = 0
+        try:
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    sequence, _, payload = line.partition(b' ')
+                    try:
+                        sequence, record = int(sequence), json.loads(payload)
+                    except ValueError:
+                        break
+                    valid_length += len(line)
+                    if sequence > after_sequence:
+                        records.append((sequence, record))
+        except FileNotFoundError:
+            pass
+        return records, valid_length
+
+    def append(self, record):
+        payload = json.dumps(record, separators=(',', ':'))
+        with self._lock:
+            self._appended += 1
+            self._pending.append(f"{self._appended} {payload}\n".encode('utf-8'))
+            self.records += 1
+            self._has_pending.notify()
+            return self._appended
+
+    def wait(self, sequence):
+        with self._lock:
+            while self._durable < sequence:
+                self._durable_changed.wait()
+
+    def _flush_loop(self):
+        while True:
+            with self._lock:
+                while not self._pending and not self._closed:
+                    self._has_pending.wait()
+                if not self._pending:
+                    return
+            if self.window:
+                time.sleep(self.window)  # let concurrent writers join this batch
+            self._flush()
+            if self._on_full is not None and self.records >= self._full_after:
+                self._on_full()
+
+    def _flush(self):
+        with self._io_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                last = self._appended
+            if batch:
+                self._file.write(b''.join(batch))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            self._mark_durable(last)
+
+    def _mark_durable(self, sequence):
+        with self._lock:
+            self._durable = max(self._durable, sequence)
+            self._durable_changed.notify_all()
+
+    def checkpoint(self, write_snapshot):
+        """Write a snapshot through write_snapshot(last_sequence) and empty the log.
+
+        The caller holds every lock that guards appends, so the snapshot
+        covers exactly the records appended so far. Recovery skips logged
+        records the snapshot covers, which makes a crash between the two steps
+        harmless.
+        """
+        with self._io_lock:
+            with self._lock:
+                self._pending = []
+                self.records = 0
+                last = self._appended
+            write_snapshot(last)
+            self._file.close()
+            self._file = open(self.path, 'wb')
+            os.fsync(self._file.fileno())
+            self._mark_durable(last)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._has_pending.notify()
+        self._thread.join()
+        self._flush()
+        self._file.close()
+
+class _NullLog:
+    """Stands in for the write-ahead log when the bank is kept in memory only."""
+
+    def append(self, record):
+        return 0
+
+    def wait(self, sequence):
+        pass
+
+    def close(self):
+        pass
+
+_NULL_LOG = _NullLog()
+
+class VelocityRule:
+    """Limit on an account's activity within the last `window` seconds.
+
+    At most max_count events and/or max_amount in total, counting events
+    whose ledger kind is in `kinds`. The window slides in `buckets` steps, so
+    it is exact to within window / buckets seconds.
+    """
+
+    def __init__(self, name, window, max_count=None, max_amount=None,
+                 kinds=('withdrawal', 'transfer_out'), buckets=20):
+        if window <= 0 or buckets <= 0:
+            raise ValueError("Velocity rule window and buckets must be positive.")
+        if max_count is None and max_amount is None:
+            raise ValueError("Velocity rule needs max_count or max_amount.")
+        self.name = name
+        self.window = window
+        self.max_count = max_count
+        self.max_amount = max_amount
+        self.kinds = frozenset(kinds)
+        self.buckets = buckets
+        self.bucket_width = window / buckets
+
+    def __str__(self):
+        limits = []
+        if self.max_count is not None:
+            limits.append(f"{self.max_count} events")
+        if self.max_amount is not None:
+            limits.append(f"{self.max_amount} in total")
+        return f"{self.name}: at most {' and '.join(limits)} per {self.window}s"
+
+class _VelocityWindow:
+    """One account's sliding window for one rule.
+
+    A ring of per-bucket counts and amounts plus their running totals. Moving
+    forward clears only the buckets that fell out of the window, so each
+    event costs O(1) amortized.
+    """
+
+    __slots__ = ('bucket', 'counts', 'amounts', 'count', 'amount')
+
+    def __init__(self, buckets):
+        self.bucket = 0  # absolute number of the newest bucket
+        self.counts = [0] * buckets
+        self.amounts = [0] * buckets
+        self.count = 0
+        self.amount = 0
+
+    def advance(self, bucket):
+        elapsed = bucket - self.bucket
+        if elapsed <= 0:
+            return
+        size = len(self.counts)
+        if elapsed >= size:
+            self.counts = [0] * size
+            self.amounts = [0] * size
+            self.count = self.amount = 0
+        else:
+            for expired in range(self.bucket + 1, bucket + 1):
+                slot = expired % size
+                self.count -= self.counts[slot]
+                self.amount -= self.amounts[slot]
+                self.counts[slot] = 0
+                self.amounts[slot] = 0
+        self.bucket = bucket
+
+class VelocityEngine:
+    """Evaluates VelocityRules inline on withdrawals and outgoing transfers.
+
+    check() runs under the account's lock, which also guards that account's
+    windows; windows are created on an account's first event.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.blocked = {rule.name: 0 for rule in self.rules}
+        self._windows = {}  # account_number -> [_VelocityWindow per rule]
+        self._rules_by_kind = {}  # ledger kind -> [(rule index, rule)] that count it
+        for index, rule in enumerate(self.rules):
+            for kind in rule.kinds:
+                self._rules_by_kind.setdefault(kind, []).append((index, rule))
+
+    def check(self, account_number, kind, amount, timestamp):
+        """Return the first rule the event would break.
+
+        Otherwise the event is recorded against every matching rule and None
+        is returned.
+        """
+        rules = self._rules_by_kind.get(kind)
+        if not rules:
+            return None
+        windows = self._windows.get(account_number)
+        if windows is None:
+            windows = self._windows[account_number] = [_VelocityWindow(rule.buckets) for rule in self.rules]
+        for index, rule in rules:
+            window = windows[index]
+            bucket = int(timestamp / rule.bucket_width)
+            if bucket != window.bucket:
+                window.advance(bucket)
+            if ((rule.max_count is not None and window.count >= rule.max_count)
+                    or (rule.max_amount is not None and window.amount + amount > rule.max_amount)):
+                self.blocked[rule.name] += 1
+                return rule
+        for index, rule in rules:
+            window = windows[index]
+            slot = window.bucket % rule.buckets
+            window.counts[slot] += 1
+            window.amounts[slot] += amount
+            window.count += 1
+            window.amount += amount
+        return None
+
+    def forget(self, account_number):
+        self._windows.pop(account_number, None)
+
+class _NoVelocityRules:
+    """Stands in for the rule engine when a bank has no velocity rules."""
+
+    def check(self, account_number, kind, amount, timestamp):
+        return None
+
+    def forget(self, account_number):
+        pass
+
+_NO_VELOCITY_RULES = _NoVelocityRules()
+
 class Account:
     def __init__(self, account_number, account_holder, balance=0):
-        self.transactions = []
+        self.ledger = Ledger(balance)
+        # Guards balance and ledger; transfers take both accounts' locks in
+        # account-number order so two opposite transfers cannot deadlock.
+        self.lock = threading.RLock()
+        self._wal = _NULL_LOG  # a durable Bank's write-ahead log
+        self._velocity = _NO_VELOCITY_RULES  # the Bank's velocity rule engine
         self.account_number = account_number
         self.account_holder = account_holder
         self.balance = balance
+        self.closed_at = None  # set when the account is closed; its ledger is kept
+
+    @property
+    def transactions(self):
+        return self.get_transaction_history()
+
+    def _credit(self, amount, kind='deposit', counterparty=Ledger.NO_COUNTERPARTY, timestamp=None):
+        self.balance += amount
+        self.ledger.append(kind, amount, counterparty, timestamp)
+
+    def _debit(self, amount, kind='withdrawal', counterparty=Ledger.NO_COUNTERPARTY, timestamp=None):
+        self.balance -= amount
+        self.ledger.append(kind, amount, counterparty, timestamp)
 
     def deposit(self, amount):
         if amount > 0:
-            self.balance += amount
-            self.transactions.append(f"Deposit: +{amount} (New balance: {self.balance})")
-            print(f"Deposited {amount}. New balance: {self.balance}")
+            with self.lock:
+                if self.closed_at is not None:
+                    print(f"Account {self.account_number} is closed.")
+                    return
+                timestamp = time.time()
+                self._credit(amount, timestamp=timestamp)
+                balance = self.balance
+                sequence = self._wal.append({'op': 'deposit', 'account': self.account_number, 'amount': amount,
+                                             'ts': timestamp})
+            self._wal.wait(sequence)
+            print(f"Deposited {amount}. New balance: {balance}")
         else:
             print("Deposit amount must be positive.")
 
     def withdraw(self, amount):
         if amount > 0:
-            if self.balance >= amount:
-                self.balance -= amount
-                self.transactions.append(f"Withdrawal: -{amount} (New balance: {self.balance})")
-                print(f"Withdrew {amount}. New balance: {self.balance}")
-            else:
-                print("Insufficient balance.")
+            with self.lock:
+                if self.closed_at is not None:
+                    print(f"Account {self.account_number} is closed.")
+                    return
+                if self.balance < amount:
+                    print("Insufficient balance.")
+                    return
+                timestamp = time.time()
+                rule = self._velocity.check(self.account_number, 'withdrawal', amount, timestamp)
+                if rule is not None:
+                    print(f"Withdrawal blocked by velocity rule {rule.name}.")
+                    return
+                self._debit(amount, timestamp=timestamp)
+                balance = self.balance
+                sequence = self._wal.append({'op': 'withdraw', 'account': self.account_number, 'amount': amount,
+                                             'ts': timestamp})
+            self._wal.wait(sequence)
+            print(f"Withdrew {amount}. New balance: {balance}")
         else:
             print("Withdrawal amount must be positive.")
 
     def get_balance(self):
         return self.balance
 
-    def get_transaction_history(self):
-        return self.transactions
+    def get_transaction_history(self, start=0, stop=None):
+        """Return the lines for entries [start, stop); page through long histories by index."""
+        return list(self.ledger.history(start, stop))
+
+    def balance_at(self, when):
+        """Return the balance as of `when` (a datetime or a time.time() timestamp), inclusive."""
+        return self.ledger.balance_at(_to_timestamp(when))
+
+    def statement(self, start, end):
+        """Stream (LedgerEntry, balance after it) for start <= time < end."""
+        return self.ledger.statement(_to_timestamp(start), _to_timestamp(end))
 
     def __str__(self):
         return f"Account No: {self.account_number}, Holder: {self.account_holder}, Balance: {self.balance}"
@@ -38,44 +522,168 @@ class Customer:
         self.customer_id = customer_id
         self.name = name
         self.address = address
-        self.accounts = []
+        self.accounts = {}  # account_number -> Account, in opening order
 
     def add_account(self, account):
-        self.accounts.append(account)
+        self.accounts[account.account_number] = account
         print(f"Account {account.account_number} added for customer {self.name}.")
 
+    def has_account(self, account_number):
+        return account_number in self.accounts
+
     def get_accounts(self):
-        return self.accounts
+        return list(self.accounts.values())
 
     def __str__(self):
         return f"Customer ID: {self.customer_id}, Name: {self.name}, Address: {self.address}"
 
 class Bank:
-    def __init__(self, name):
+    def __init__(self, name, data_dir=None, group_commit_window=0, snapshot_every=100_000, velocity_rules=()):
+        """Create a bank, recovering it from data_dir if one is given.
+
+        With data_dir set, every operation is logged before it is acknowledged
+        and the bank is rebuilt from the snapshot and log found there;
+        otherwise it lives in memory only. velocity_rules are enforced on
+        withdrawals and transfers, not on replayed operations.
+        """
         self.name = name
+        self.velocity = VelocityEngine(velocity_rules) if velocity_rules else _NO_VELOCITY_RULES
         self.customers = {}
         self.accounts = {}
+        self.closed_accounts = {}  # account_number -> closed Account, kept for its ledger
         self.next_account_number = 1001
+        self._lock = threading.Lock()  # guards customers, accounts, closed_accounts and next_account_number
+        self._wal = _NULL_LOG
+        self._snapshot_file = None
+        if data_dir is not None:
+            os.makedirs(data_dir, exist_ok=True)
+            self._snapshot_file = os.path.join(data_dir, 'bank.snapshot.json')
+            wal_file = os.path.join(data_dir, 'bank.wal')
+            last_sequence, valid_length = self._recover(wal_file)
+            self._wal = _WriteAheadLog(wal_file, group_commit_window, last_sequence, self.snapshot, snapshot_every,
+                                       valid_length)
+        for account in self.accounts.values():
+            account._wal = self._wal
+            account._velocity = self.velocity
+
+    def _recover(self, wal_file):
+        sequence = 0
+        try:
+            with open(self._snapshot_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = None
+        if state is not None:
+            sequence = state['sequence']
+            self.next_account_number = state['next_account_number']
+            for data in state['accounts'] + state.get('closed_accounts', []):
+                account = Account(data['number'], data['holder'], data['opening_balance'])
+                account.ledger = Ledger.from_columns(data['opening_balance'], data['ledger'])
+                account.balance = data['balance']
+                account.closed_at = data.get('closed_at')
+                if account.closed_at is None:
+                    self.accounts[account.account_number] = account
+                else:
+                    self.closed_accounts[account.account_number] = account
+            for data in state['customers']:
+                customer = Customer(data['id'], data['name'], data['address'])
+                customer.accounts = {number: self.accounts[number] for number in data['accounts']
+                                     if number in self.accounts}
+                self.customers[customer.customer_id] = customer
+        records, valid_length = _WriteAheadLog.read(wal_file, sequence)
+        for sequence, record in records:
+            self._replay(record)
+        return sequence, valid_length
+
+    def _replay(self, record):
+        op = record['op']
+        if op == 'customer':
+            self.customers[record['id']] = Customer(record['id'], record['name'], record['address'])
+        elif op == 'open':
+            customer = self.customers[record['customer']]
+            account = Account(record['account'], customer.name, record['balance'])
+            self.accounts[account.account_number] = account
+            customer.accounts[account.account_number] = account
+            self.next_account_number = max(self.next_account_number, account.account_number + 1)
+        elif op == 'remove_customers':
+            self._remove_customers(record['ids'], record['ts'])
+        elif op == 'deposit':
+            self.accounts[record['account']]._credit(record['amount'], timestamp=record['ts'])
+        elif op == 'withdraw':
+            self.accounts[record['account']]._debit(record['amount'], timestamp=record['ts'])
+        elif op == 'transfer':
+            self.accounts[record['from']]._debit(record['amount'], 'transfer_out', record['to'], record['ts'])
+            self.accounts[record['to']]._credit(record['amount'], 'transfer_in', record['from'], record['ts'])
+        elif op == 'settle':
+            self._apply_settlement(record['transfers'], self._net_positions(record['transfers'])[1], record['ts'])
+
+    def snapshot(self):
+        """Write every balance and ledger to the snapshot file and restart the log.
+
+        All operations are paused while it runs.
+        """
+        if self._snapshot_file is None:
+            return
+        with self._lock, contextlib.ExitStack() as stack:
+            for number in sorted(self.accounts):
+                stack.enter_context(self.accounts[number].lock)
+            self._wal.checkpoint(self._write_snapshot)
+
+    def _write_snapshot(self, sequence):
+        state = {
+            'sequence': sequence,
+            'next_account_number': self.next_account_number,
+            'customers': [{'id': customer.customer_id, 'name': customer.name, 'address': customer.address,
+                           'accounts': list(customer.accounts)}
+                          for customer in self.customers.values()],
+            'accounts': [self._account_state(account) for account in self.accounts.values()],
+            'closed_accounts': [self._account_state(account) for account in self.closed_accounts.values()],
+        }
+        temp_file = self._snapshot_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self._snapshot_file)
+
+    @staticmethod
+    def _account_state(account):
+        return {'number': account.account_number, 'holder': account.account_holder, 'balance': account.balance,
+                'opening_balance': account.ledger.opening_balance, 'ledger': account.ledger.to_columns(),
+                'closed_at': account.closed_at}
+
+    def close(self):
+        self._wal.close()
 
     def add_customer(self, customer):
-        if customer.customer_id not in self.customers:
+        with self._lock:
+            if customer.customer_id in self.customers:
+                print(f"Customer with ID {customer.customer_id} already exists.")
+                return
             self.customers[customer.customer_id] = customer
-            print(f"Customer {customer.name} added to {self.name}.")
-        else:
-            print(f"Customer with ID {customer.customer_id} already exists.")
+            sequence = self._wal.append({'op': 'customer', 'id': customer.customer_id, 'name': customer.name,
+                                         'address': customer.address})
+        self._wal.wait(sequence)
+        print(f"Customer {customer.name} added to {self.name}.")
 
     def create_account(self, customer_id, initial_balance=0):
-        if customer_id in self.customers:
+        with self._lock:
+            customer = self.customers.get(customer_id)
+            if customer is None:
+                print(f"Customer with ID {customer_id} not found.")
+                return None
             account_number = self.next_account_number
             self.next_account_number += 1
-            account = Account(account_number, self.customers[customer_id].name, initial_balance)
+            account = Account(account_number, customer.name, initial_balance)
+            account._wal = self._wal
+            account._velocity = self.velocity
             self.accounts[account_number] = account
-            self.customers[customer_id].add_account(account)
-            print(f"Account {account_number} created for customer {self.customers[customer_id].name}.")
-            return account
-        else:
-            print(f"Customer with ID {customer_id} not found.")
-            return None
+            customer.add_account(account)
+            sequence = self._wal.append({'op': 'open', 'customer': customer_id, 'account': account_number,
+                                         'balance': initial_balance})
+        self._wal.wait(sequence)
+        print(f"Account {account_number} created for customer {customer.name}.")
+        return account
 
     def get_account(self, account_number):
         return self.accounts.get(account_number)
@@ -83,17 +691,53 @@ class Bank:
     def get_customer(self, customer_id):
         return self.customers.get(customer_id)
 
-    def remove_customer(self, customer_id):
-        if customer_id in self.customers:
+    def get_closed_account(self, account_number):
+        return self.closed_accounts.get(account_number)
+
+    def _remove_customers(self, customer_ids, timestamp):
+        """Drop the customers and close their accounts.
+
+        A closed account leaves self.accounts but keeps its balance and ledger
+        in closed_accounts. The caller holds self._lock.
+        """
+        closed = 0
+        for customer_id in customer_ids:
             customer = self.customers.pop(customer_id)
-            # Remove all accounts associated with this customer
-            accounts_to_remove = [acc.account_number for acc in customer.get_accounts()]
-            for acc_num in accounts_to_remove:
-                if acc_num in self.accounts:
-                    del self.accounts[acc_num]
-            print(f"Customer {customer.name} and all associated accounts removed from {self.name}.")
-        else:
-            print(f"Customer with ID {customer_id} not found.")
+            for account_number, account in customer.accounts.items():
+                with account.lock:
+                    account.closed_at = timestamp
+                del self.accounts[account_number]
+                self.closed_accounts[account_number] = account
+                self.velocity.forget(account_number)
+            closed += len(customer.accounts)
+        return closed
+
+    def remove_customer(self, customer_id):
+        with self._lock:
+            customer = self.customers.get(customer_id)
+            if customer is None:
+                print(f"Customer with ID {customer_id} not found.")
+                return
+            timestamp = time.time()
+            self._remove_customers([customer_id], timestamp)
+            sequence = self._wal.append({'op': 'remove_customers', 'ids': [customer_id], 'ts': timestamp})
+        self._wal.wait(sequence)
+        print(f"Customer {customer.name} and all associated accounts removed from {self.name}.")
+
+    def remove_customers(self, customer_ids):
+        """Offboard many customers at once and return the number removed.
+
+        Their accounts are closed as in remove_customer, and the whole batch is
+        one log record and one wait for durability. Unknown IDs are skipped.
+        """
+        with self._lock:
+            found = list(dict.fromkeys(customer_id for customer_id in customer_ids if customer_id in self.customers))
+            timestamp = time.time()
+            closed = self._remove_customers(found, timestamp)
+            sequence = self._wal.append({'op': 'remove_customers', 'ids': found, 'ts': timestamp}) if found else 0
+        self._wal.wait(sequence)
+        print(f"Removed {len(found)} customers and closed {closed} accounts in {self.name}.")
+        return len(found)
 
     def transfer_funds(self, from_account_num, to_account_num, amount):
         from_account = self.get_account(from_account_num)
@@ -101,24 +745,417 @@ class Bank:
 
         if not from_account:
             print(f"Source account {from_account_num} not found.")
-            return
+            return False
         if not to_account:
             print(f"Destination account {to_account_num} not found.")
-            return
+            return False
         if amount <= 0:
             print("Transfer amount must be positive.")
-            return
+            return False
 
-        if from_account.get_balance() >= amount:
-            from_account.withdraw(amount)
-            to_account.deposit(amount)
-            print(f"Successfully transferred {amount} from {from_account_num} to {to_account_num}.")
-        else:
-            print(f"Insufficient balance in account {from_account_num} for transfer.")
+        first, second = sorted((from_account, to_account), key=lambda account: account.account_number)
+        with first.lock, second.lock:
+            if from_account.closed_at is not None or to_account.closed_at is not None:
+                closed = from_account_num if from_account.closed_at is not None else to_account_num
+                print(f"Account {closed} is closed.")
+                return False
+            if from_account.balance < amount:
+                print(f"Insufficient balance in account {from_account_num} for transfer.")
+                return False
+            timestamp = time.time()
+            rule = from_account._velocity.check(from_account_num, 'transfer_out', amount, timestamp)
+            if rule is not None:
+                print(f"Transfer from account {from_account_num} blocked by velocity rule {rule.name}.")
+                return False
+            from_balance, to_balance = from_account.balance, to_account.balance
+            from_entries, to_entries = len(from_account.ledger), len(to_account.ledger)
+            try:
+                from_account._debit(amount, 'transfer_out', to_account_num, timestamp)
+                to_account._credit(amount, 'transfer_in', from_account_num, timestamp)
+            except Exception:
+                # Undo both sides so a failed transfer never creates or loses money.
+                from_account.balance, to_account.balance = from_balance, to_balance
+                from_account.ledger.truncate(from_entries)
+                to_account.ledger.truncate(to_entries)
+                raise
+            sequence = self._wal.append({'op': 'transfer', 'from': from_account_num, 'to': to_account_num,
+                                         'amount': amount, 'ts': timestamp})
+        self._wal.wait(sequence)
+        print(f"Successfully transferred {amount} from {from_account_num} to {to_account_num}.")
+        return True
+
+    @staticmethod
+    def _net_positions(transfers):
+        """Net the transfers per account pair, then per account."""
+        pair_net = {}
+        for from_account_num, to_account_num, amount in transfers:
+            if from_account_num < to_account_num:
+                key, signed = (from_account_num, to_account_num), amount
+            else:
+                key, signed = (to_account_num, from_account_num), -amount
+            pair_net[key] = pair_net.get(key, 0) + signed
+        account_net = {}
+        for (low, high), amount in pair_net.items():
+            account_net[low] = account_net.get(low, 0) - amount
+            account_net[high] = account_net.get(high, 0) + amount
+        return pair_net, account_net
+
+    def _apply_settlement(self, transfers, account_net, timestamp):
+        append = {number: self.accounts[number].ledger.append for number in account_net}
+        for from_account_num, to_account_num, amount in transfers:
+            append[from_account_num]('transfer_out', amount, to_account_num, timestamp)
+            append[to_account_num]('transfer_in', amount, from_account_num, timestamp)
+        for number, amount in account_net.items():
+            self.accounts[number].balance += amount
+
+    def settle_transfers(self, transfers):
+        """End-of-day settlement of (from_account_num, to_account_num, amount) transfers.
+
+        Transfers are netted per account pair and only each account's net
+        movement has to be covered by its balance. Either the whole batch is
+        applied, with a ledger entry per transfer, or nothing is.
+        """
+        transfers = list(transfers)
+        for from_account_num, to_account_num, amount in transfers:
+            if from_account_num not in self.accounts or to_account_num not in self.accounts:
+                missing = from_account_num if from_account_num not in self.accounts else to_account_num
+                print(f"Settlement rejected: account {missing} not found.")
+                return False
+            if amount <= 0:
+                print("Settlement rejected: transfer amounts must be positive.")
+                return False
+        pair_net, account_net = self._net_positions(transfers)
+
+        accounts = [self.accounts[number] for number in sorted(account_net)]
+        with contextlib.ExitStack() as stack:
+            for account in accounts:
+                stack.enter_context(account.lock)
+            for account in accounts:
+                if account.closed_at is not None:
+                    print(f"Settlement rejected: account {account.account_number} is closed.")
+                    return False
+                if account.balance + account_net[account.account_number] < 0:
+                    print(f"Settlement rejected: insufficient balance in account {account.account_number}.")
+                    return False
+            saved = [(account, account.balance, len(account.ledger)) for account in accounts]
+            timestamp = time.time()
+            try:
+                self._apply_settlement(transfers, account_net, timestamp)
+            except Exception:
+                for account, balance, entries in saved:
+                    account.balance = balance
+                    account.ledger.truncate(entries)
+                raise
+            sequence = self._wal.append({'op': 'settle', 'transfers': transfers, 'ts': timestamp})
+        self._wal.wait(sequence)
+        print(f"Settled {len(transfers)} transfers as {len(pair_net)} net account-pair movements "
+              f"across {len(accounts)} accounts.")
+        return True
 
     def __str__(self):
         return f"Bank: {self.name}, Customers: {len(self.customers)}, Accounts: {len(self.accounts)}"
 
+class _Shard:
+    """One partition of a ShardedBank, living in its own worker process.
+
+    Requests are handled one at a time, so no locking is needed. `held` is
+    money reserved by prepared cross-shard transfers, which withdrawals and
+    transfers may not spend until the transfer commits or aborts. Account
+    operations return the new balance, or None when they did not happen.
+    """
+
+    def __init__(self):
+        self.bank = Bank("shard")
+        self.held = {}
+        self.prepared = {}  # txid -> (kind, account_number, amount, counterparty)
+
+    def handle(self, op, *args):
+        return getattr(self, op)(*args)
+
+    def available(self, account_number):
+        account = self.bank.accounts.get(account_number)
+        return None if account is None else account.balance - self.held.get(account_number, 0)
+
+    def customer(self, customer_id, name, address):
+        if customer_id not in self.bank.customers:
+            self.bank.add_customer(Customer(customer_id, name, address))
+
+    def open(self, customer_id, account_number, balance):
+        self.bank.next_account_number = account_number
+        return self.bank.create_account(customer_id, balance).balance
+
+    def balance(self, account_number):
+        account = self.bank.accounts.get(account_number)
+        return None if account is None else account.balance
+
+    def deposit(self, account_number, amount):
+        account = self.bank.accounts.get(account_number)
+        if account is None or amount <= 0:
+            return None
+        account.deposit(amount)
+        return account.balance
+
+    def withdraw(self, account_number, amount):
+        available = self.available(account_number)
+        if available is None or amount <= 0 or available < amount:
+            return None
+        account = self.bank.accounts[account_number]
+        account.withdraw(amount)
+        return account.balance
+
+    def transfer(self, from_account_num, to_account_num, amount):
+        available = self.available(from_account_num)
+        if available is None or available < amount:
+            return False
+        return self.bank.transfer_funds(from_account_num, to_account_num, amount)
+
+    def prepare_debit(self, txid, account_number, amount, counterparty):
+        """Phase one on the source shard: vote yes by reserving the amount."""
+        available = self.available(account_number)
+        if available is None or available < amount:
+            return False
+        self.held[account_number] = self.held.get(account_number, 0) + amount
+        self.prepared[txid] = ('transfer_out', account_number, amount, counterparty)
+        return True
+
+    def prepare_credit(self, txid, account_number, amount, counterparty):
+        """Phase one on the destination shard: vote yes if the account exists."""
+        if account_number not in self.bank.accounts:
+            return False
+        self.prepared[txid] = ('transfer_in', account_number, amount, counterparty)
+        return True
+
+    def _release(self, account_number, amount):
+        held = self.held[account_number] - amount
+        if held:
+            self.held[account_number] = held
+        else:
+            del self.held[account_number]
+
+    def commit(self, txid):
+        kind, account_number, amount, counterparty = self.prepared.pop(txid)
+        account = self.bank.accounts[account_number]
+        with account.lock:
+            if kind == 'transfer_out':
+                self._release(account_number, amount)
+                account._debit(amount, kind, counterparty, time.time())
+            else:
+                account._credit(amount, kind, counterparty, time.time())
+        return account.balance
+
+    def abort(self, txid):
+        prepared = self.prepared.pop(txid, None)
+        if prepared is not None and prepared[0] == 'transfer_out':
+            self._release(prepared[1], prepared[2])
+
+def _shard_main(connection):
+    """Worker process loop: answer each list of (op, *args) requests, stop on None.
+
+    The Bank's messages are dropped; the ShardedBank reports outcomes itself.
+    """
+    shard = _Shard()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        while True:
+            requests = connection.recv()
+            if requests is None:
+                break
+            connection.send([shard.handle(*request) for request in requests])
+    connection.close()
+
+class ShardedBank:
+    """Accounts partitioned across worker processes by account_number.
+
+    Account work is spread over cores instead of sharing one interpreter's
+    GIL. Deposits, withdrawals and transfers within one shard go straight to
+    the owning shard. A transfer between shards uses two-phase commit: the
+    source shard reserves the money and the destination shard confirms the
+    account; if both vote yes both legs are committed, otherwise both are
+    aborted. Customers stay here and know their accounts by number only.
+    Shards keep their state in memory.
+    """
+
+    def __init__(self, name, shards=None):
+        self.name = name
+        self.customers = {}
+        self.customer_accounts = {}  # customer_id -> account numbers; the Accounts live in the shards
+        self.next_account_number = 1001
+        self._lock = threading.Lock()  # guards customers, customer_accounts and next_account_number
+        self._txids = itertools.count(1)
+        self._connections = []
+        self._connection_locks = []  # one request/response exchange per shard at a time
+        self._processes = []
+        context = multiprocessing.get_context()
+        for _ in range(shards or os.cpu_count() or 1):
+            connection, child_connection = context.Pipe()
+            process = context.Process(target=_shard_main, args=(child_connection,), daemon=True)
+            process.start()
+            child_connection.close()
+            self._connections.append(connection)
+            self._connection_locks.append(threading.Lock())
+            self._processes.append(process)
+
+    @property
+    def shards(self):
+        return len(self._connections)
+
+    def shard_of(self, account_number):
+        return account_number % len(self._connections)
+
+    def _send(self, requests):
+        """Send {shard: [request, ...]} and return {shard: [result, ...]}.
+
+        Every shard gets its requests before any answer is read, so the
+        shards work in parallel.
+        """
+        shards = sorted(requests)
+        with contextlib.ExitStack() as stack:
+            for shard in shards:
+                stack.enter_context(self._connection_locks[shard])
+            for shard in shards:
+                self._connections[shard].send(requests[shard])
+            return {shard: self._connections[shard].recv() for shard in shards}
+
+    def _request(self, op, account_number, *args):
+        shard = self.shard_of(account_number)
+        return self._send({shard: [(op, account_number, *args)]})[shard][0]
+
+    def close(self):
+        for connection, lock in zip(self._connections, self._connection_locks):
+            with lock:
+                connection.send(None)
+                connection.close()
+        for process in self._processes:
+            process.join()
+
+    def add_customer(self, customer):
+        with self._lock:
+            if customer.customer_id in self.customers:
+                print(f"Customer with ID {customer.customer_id} already exists.")
+                return
+            self.customers[customer.customer_id] = customer
+        print(f"Customer {customer.name} added to {self.name}.")
+
+    def create_account(self, customer_id, initial_balance=0):
+        """Return the new account number, or None if the customer is unknown."""
+        with self._lock:
+            customer = self.customers.get(customer_id)
+            if customer is None:
+                print(f"Customer with ID {customer_id} not found.")
+                return None
+            account_number = self.next_account_number
+            self.next_account_number += 1
+            shard = self.shard_of(account_number)
+            self._send({shard: [('customer', customer.customer_id, customer.name, customer.address),
+                                ('open', customer_id, account_number, initial_balance)]})
+            self.customer_accounts.setdefault(customer_id, []).append(account_number)
+        print(f"Account {account_number} created for customer {customer.name}.")
+        return account_number
+
+    def get_balance(self, account_number):
+        return self._request('balance', account_number)
+
+    def deposit(self, account_number, amount):
+        if amount <= 0:
+            print("Deposit amount must be positive.")
+            return None
+        balance = self._request('deposit', account_number, amount)
+        if balance is None:
+            print(f"Account {account_number} not found.")
+        else:
+            print(f"Deposited {amount}. New balance: {balance}")
+        return balance
+
+    def withdraw(self, account_number, amount):
+        if amount <= 0:
+            print("Withdrawal amount must be positive.")
+            return None
+        balance = self._request('withdraw', account_number, amount)
+        if balance is not None:
+            print(f"Withdrew {amount}. New balance: {balance}")
+        elif self.get_balance(account_number) is None:
+            print(f"Account {account_number} not found.")
+        else:
+            print("Insufficient balance.")
+        return balance
+
+    def apply_batch(self, operations):
+        """Apply ('deposit' | 'withdraw', account_number, amount) operations with one round trip per shard.
+
+        Operations on the same account run in the given order. Returns each
+        one's new balance, or None if it failed.
+        """
+        requests, positions = {}, {}
+        for index, (op, account_number, amount) in enumerate(operations):
+            if op not in ('deposit', 'withdraw'):
+                raise ValueError(f"Unsupported batch operation: {op}")
+            shard = self.shard_of(account_number)
+            requests.setdefault(shard, []).append((op, account_number, amount))
+            positions.setdefault(shard, []).append(index)
+        results = [None] * len(operations)
+        for shard, answers in self._send(requests).items():
+            for index, answer in zip(positions[shard], answers):
+                results[index] = answer
+        return results
+
+    def transfer_many(self, transfers):
+        """Run (from_account_num, to_account_num, amount) transfers; return a bool per transfer.
+
+        Same-shard transfers and the prepare votes of cross-shard transfers go
+        out together, then each cross-shard transfer is committed or aborted
+        on both shards. Every transfer succeeds or fails on its own; money a
+        transfer receives is only spendable by later transfers in the batch
+        once committed.
+        """
+        results = [False] * len(transfers)
+        requests, owners = {}, {}
+        cross_shard = []
+        for index, (from_account_num, to_account_num, amount) in enumerate(transfers):
+            if amount <= 0:
+                continue
+            source, destination = self.shard_of(from_account_num), self.shard_of(to_account_num)
+            if source == destination:
+                requests.setdefault(source, []).append(('transfer', from_account_num, to_account_num, amount))
+                owners.setdefault(source, []).append(index)
+                continue
+            txid = next(self._txids)
+            requests.setdefault(source, []).append(('prepare_debit', txid, from_account_num, amount, to_account_num))
+            owners.setdefault(source, []).append(None)
+            requests.setdefault(destination, []).append(('prepare_credit', txid, to_account_num, amount,
+                                                         from_account_num))
+            owners.setdefault(destination, []).append(None)
+            cross_shard.append((index, txid, source, destination))
+        votes = {}
+        for shard, answers in self._send(requests).items():
+            for request, index, answer in zip(requests[shard], owners[shard], answers):
+                if index is not None:
+                    results[index] = answer
+                else:
+                    votes.setdefault(request[1], []).append(answer)
+        decisions = {}
+        for index, txid, source, destination in cross_shard:
+            results[index] = all(votes[txid])
+            decision = 'commit' if results[index] else 'abort'
+            decisions.setdefault(source, []).append((decision, txid))
+            decisions.setdefault(destination, []).append((decision, txid))
+        if decisions:
+            self._send(decisions)
+        return results
+
+    def transfer_funds(self, from_account_num, to_account_num, amount):
+        if amount <= 0:
+            print("Transfer amount must be positive.")
+            return False
+        if self.transfer_many([(from_account_num, to_account_num, amount)])[0]:
+            print(f"Successfully transferred {amount} from {from_account_num} to {to_account_num}.")
+            return True
+        print(f"Transfer of {amount} from {from_account_num} to {to_account_num} failed: "
+              f"account not found or insufficient balance.")
+        return False
+
+    def __str__(self):
+        accounts = sum(len(numbers) for numbers in self.customer_accounts.values())
+        return f"Bank: {self.name}, Shards: {self.shards}, Customers: {len(self.customers)}, Accounts: {accounts}"
+
 # Example Usage:
 if __name__ == "__main__":
     my_bank = Bank("My Awesome Bank")
@@ -0,0 +1,264 @@
+import argparse
+import contextlib
+import gc
+import io
+import math
+import os
+import random
+import tempfile
+import time
+
+from employee_management import Company, Employee, FullTimeEmployee, Manager, PartTimeEmployee, np
+
+DEPARTMENTS = ["Engineering", "Sales", "Marketing", "Finance", "Operations", "Support", "Legal", "Research"]
+FIRST_NAMES = ["Ava", "Liam", "Noah", "Emma", "Mia", "Ethan", "Zara", "Omar", "Yuki", "Ines", "Raj", "Lena"]
+LAST_NAMES = ["Smith", "Garcia", "Nakamura", "Okafor", "Ivanova", "Rossi", "Dubois", "Chen", "Patel", "Silva"]
+
+def make_employees(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    for i in range(count):
+        employee_id = f"E{i:07d}"
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        department = rng.choice(DEPARTMENTS)
+        kind = rng.random()
+        if kind < 0.6:
+            yield FullTimeEmployee(employee_id, name, department, round(rng.uniform(3000, 12000), 2))
+        elif kind < 0.9:
+            yield PartTimeEmployee(employee_id, name, department, round(rng.uniform(15, 60), 2), rng.randint(20, 120))
+        else:
+            yield Manager(employee_id, name, department, round(rng.uniform(8000, 20000), 2), round(rng.uniform(500, 5000), 2))
+
+def empty_company(**kwargs) -> Company:
+    path = os.path.join(tempfile.mkdtemp(), "employees.json")
+    return Company(path, **kwargs)
+
+def populated_company(count: int, **kwargs) -> Company:
+    company = empty_company(**kwargs)
+    for emp in make_employees(count):
+        company._employees[emp.employee_id] = emp
+        company._track(emp)
+    company._rebuild_indexes()
+    return company
+
+def bench_snapshot_formats(sizes):
+    print("\n--- Company snapshot formats: pretty-printed JSON vs binary ---")
+    print(f"{'Employees':>10} {'Format':>7} {'Save':>8} {'Load':>8} {'Size':>10}")
+    for size in sizes:
+        source = populated_company(size)
+        expected = [emp.to_dict() for emp in source._employees.values()]
+        directory = tempfile.mkdtemp()
+        for snapshot_format in ('json', 'binary'):
+            company = Company(os.path.join(directory, f"employees.{snapshot_format}"), snapshot_format=snapshot_format)
+            company._employees = source._employees
+            start = time.perf_counter()
+            company._save_data()
+            save_time = time.perf_counter() - start
+            gc.collect()
+            start = time.perf_counter()
+            loaded = Company(company._data_file, snapshot_format=snapshot_format)
+            load_time = time.perf_counter() - start
+            # Round trip: both formats must reload to the same employees, with
+            # ints still ints (40 and 40.0 compare equal, so compare types too).
+            actual = [emp.to_dict() for emp in loaded._employees.values()]
+            assert [[(key, value, type(value)) for key, value in d.items()] for d in actual] == \
+                [[(key, value, type(value)) for key, value in d.items()] for d in expected], \
+                f"{snapshot_format} snapshot did not round-trip"
+            file_size = os.path.getsize(company._data_file)
+            print(f"{size:>10,} {snapshot_format:>7} {save_time:>7.2f}s {load_time:>7.2f}s {file_size / 2**20:>8.1f}MB")
+    print("Round trip: JSON and binary snapshots reload to identical employees.")
+
+def bench_update_latency(sizes, updates: int = 20):
+    print("\n--- update_employee latency: full snapshot rewrite vs dirty-record journal ---")
+    print(f"{'Employees':>10} {'Mode':>8} {'Per update':>11}")
+    for size in sizes:
+        for journal in (False, True):
+            company = populated_company(size, journal=journal)
+            company.compact()
+            ids = random.Random(size).sample(list(company._employees), updates)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for employee_id in ids:
+                    company.update_employee(employee_id, department=random.choice(DEPARTMENTS))
+            per_update = (time.perf_counter() - start) / updates
+            reloaded = Company(company._data_file, journal=journal)
+            assert [emp.to_dict() for emp in reloaded._employees.values()] == \
+                [emp.to_dict() for emp in company._employees.values()], "journal replay lost an update"
+            mode = "journal" if journal else "snapshot"
+            print(f"{size:>10,} {mode:>8} {per_update * 1000:>9.3f}ms")
+    print("Both modes reload to identical employees.")
+
+def bench_payroll(sizes, runs: int = 5):
+    print(f"\n--- Month-end payroll: per-object calculate_salary() vs columnar passes (numpy: {np is not None}) ---")
+    print(f"{'Employees':>10} {'Per-object':>11} {'Build':>8} {'Columnar':>9} {'Speedup':>8}")
+    for size in sizes:
+        company = populated_company(size)
+        employees = list(company._employees.values())
+        start = time.perf_counter()
+        for _ in range(runs):
+            expected = sum(emp.calculate_salary() for emp in employees)
+            by_department = {}
+            for emp in employees:
+                by_department[emp.department] = by_department.get(emp.department, 0.0) + emp.calculate_salary()
+        object_time = (time.perf_counter() - start) / runs
+        start = time.perf_counter()
+        company._payroll_columns()
+        build_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(runs):
+            total, departments = company._payroll_columns().totals()
+        columnar_time = (time.perf_counter() - start) / runs
+        assert math.isclose(total, expected, rel_tol=1e-9), "columnar payroll total differs"
+        for department, amount in by_department.items():
+            assert math.isclose(departments[department][1], amount, rel_tol=1e-9), department
+        print(f"{size:>10,} {object_time * 1000:>9.1f}ms {build_time * 1000:>6.1f}ms "
+              f"{columnar_time * 1000:>7.1f}ms {object_time / columnar_time:>7.1f}x")
+    print("Totals and per-department breakdowns match the per-object computation.")
+
+def bench_lookups(sizes, queries: int = 200):
+    print("\n--- Name-prefix and department lookups: full scan vs secondary indexes ---")
+    print(f"{'Employees':>10} {'Name scan':>10} {'Name index':>11} {'Dept scan':>10} {'Dept index':>11}")
+    rng = random.Random(7)
+    prefixes = [rng.choice(LAST_NAMES)[:3] for _ in range(queries)]
+    departments = [rng.choice(DEPARTMENTS) for _ in range(queries)]
+    for size in sizes:
+        company = populated_company(size)
+        employees = list(company._employees.values())
+
+        def scan_names(prefix):
+            prefix = prefix.casefold()
+            return [emp for emp in employees if any(word.startswith(prefix) for word in emp.name.casefold().split())]
+
+        def scan_department(department):
+            return sorted((emp for emp in employees if emp.department == department), key=lambda emp: emp.employee_id)
+
+        timings = []
+        for lookup, args in ((scan_names, prefixes), (company.search_employees_by_name, prefixes),
+                             (scan_department, departments), (company.employees_in_department, departments)):
+            start = time.perf_counter()
+            for arg in args[:20]:
+                lookup(arg)
+            timings.append((time.perf_counter() - start) / 20)
+        for prefix in prefixes[:20]:
+            assert sorted(emp.employee_id for emp in company.search_employees_by_name(prefix)) == \
+                sorted(emp.employee_id for emp in scan_names(prefix)), prefix
+        for department in departments[:20]:
+            assert company.employees_in_department(department) == scan_department(department), department
+        name_scan, name_index, department_scan, department_index = (t * 1000 for t in timings)
+        print(f"{size:>10,} {name_scan:>8.2f}ms {name_index:>9.2f}ms {department_scan:>8.2f}ms {department_index:>9.2f}ms")
+    print("Indexed lookups return the same employees as the scans.")
+
+def bench_payslips(sizes, workers):
+    print(f"\n--- Payslip generation across worker processes ({os.cpu_count()} cores) ---")
+    print(f"{'Employees':>10} {'Workers':>8} {'Wall':>7} {'Extract':>8} {'Render':>7} {'Write':>7} {'Payslips/s':>11}")
+    for size in sizes:
+        company = populated_company(size)
+        for worker_count in workers:
+            stats = company.generate_payslips(tempfile.mkdtemp(), period="2024-01", workers=worker_count)
+            assert stats['payslips'] == size, "payslip count does not match headcount"
+            print(f"{size:>10,} {worker_count:>8} {stats['seconds']:>6.2f}s {stats['extract']:>7.2f}s "
+                  f"{stats['render']:>6.2f}s {stats['write']:>6.2f}s {stats['payslips_per_second']:>11,.0f}")
+    print("Render and write are summed across workers; wall time shows the speedup.")
+
+def bench_bulk_update(sizes):
+    print("\n--- Annual raise for every employee: looping update_employee vs bulk_update ---")
+    print(f"{'Employees':>10} {'Mode':>8} {'Loop':>9} {'Bulk':>8}")
+    for size in sizes:
+        for journal in (False, True):
+            company = populated_company(size, journal=journal)
+            company.compact()
+            raises = {}
+            for employee_id, emp in company._employees.items():
+                if isinstance(emp, PartTimeEmployee):
+                    raises[employee_id] = {'hourly_rate': round(emp.hourly_rate * 1.03, 2)}
+                else:
+                    raises[employee_id] = {'monthly_salary': round(emp.monthly_salary * 1.03, 2)}
+            # Full snapshot rewrites per update are too slow to loop over every
+            # employee; time a sample and scale it to the whole headcount.
+            sample = list(raises.items()) if journal else list(raises.items())[:20]
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for employee_id, fields in sample:
+                    company.update_employee(employee_id, **fields)
+            loop_time = (time.perf_counter() - start) / len(sample) * size
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                assert company.bulk_update(raises)
+            bulk_time = time.perf_counter() - start
+            reloaded = Company(company._data_file, journal=journal)
+            assert [emp.to_dict() for emp in reloaded._employees.values()] == \
+                [emp.to_dict() for emp in company._employees.values()], "bulk update was not persisted"
+            mode = "journal" if journal else "snapshot"
+            print(f"{size:>10,} {mode:>8} {loop_time:>8.2f}s {bulk_time:>7.2f}s")
+    print("Loop times in snapshot mode are extrapolated from 20 updates.")
+
+def bench_startup(sizes):
+    print("\n--- Company startup: validating constructors vs trusted registry load ---")
+    print(f"{'Employees':>10} {'Format':>7} {'Decode':>8} {'Validating':>11} {'Trusted':>8}")
+    for size in sizes:
+        source = populated_company(size)
+        expected = [emp.to_dict() for emp in source._employees.values()]
+        directory = tempfile.mkdtemp()
+        for snapshot_format in ('json', 'binary'):
+            path = os.path.join(directory, f"employees.{snapshot_format}")
+            writer = Company(path, snapshot_format=snapshot_format)
+            writer._employees = source._employees
+            writer._save_data()
+            gc.collect()
+            start = time.perf_counter()
+            writer._read_data_list()
+            decode_time = time.perf_counter() - start
+            timings = []
+            for validate_on_load in (True, False):
+                gc.collect()
+                start = time.perf_counter()
+                loaded = Company(path, snapshot_format=snapshot_format, validate_on_load=validate_on_load)
+                timings.append(time.perf_counter() - start)
+                assert [emp.to_dict() for emp in loaded._employees.values()] == expected, "load paths disagree"
+            print(f"{size:>10,} {snapshot_format:>7} {decode_time:>7.2f}s {timings[0]:>10.2f}s {timings[1]:>7.2f}s")
+    print("Both load paths produce identical employees; decode is the file parse alone.")
+
+def bench_scenarios(sizes, scenarios: int = 24):
+    print(f"\n--- What-if payroll scenarios on copy-on-write payroll columns (numpy: {np is not None}) ---")
+    print(f"{'Employees':>10} {'Scenarios':>10} {'Per scenario':>13} {'Per second':>11} {'Changed':>9}")
+    for size in sizes:
+        company = populated_company(size)
+        live_total = company.calculate_total_payroll()
+        live_state = [emp.to_dict() for emp in company._employees.values()]
+        start = time.perf_counter()
+        for i in range(scenarios):
+            scenario = company.what_if()
+            changed = scenario.raise_pay(1 + i % 6, department=DEPARTMENTS[i % len(DEPARTMENTS)])
+            changed += scenario.cap_bonus(1000 + 250 * (i % 8))
+        per_scenario = (time.perf_counter() - start) / scenarios
+        # The running total must match a full pass over the scenario's columns
+        # and over the employees with the scenario's changes applied.
+        expected = scenario._payroll.totals()[0]
+        assert math.isclose(scenario.total_payroll(), expected, rel_tol=1e-9), "incremental total drifted"
+        changes = scenario.changes()
+        assert 0 < len(changes) <= changed, "changes() disagrees with the rules"
+        recomputed = 0.0
+        for employee_id, emp in company._employees.items():
+            data = dict(emp.to_dict(), **changes.get(employee_id, {}))
+            recomputed += Employee.from_dict(data).calculate_salary()
+        assert math.isclose(scenario.total_payroll(), recomputed, rel_tol=1e-9), "scenario total is wrong"
+        assert company.calculate_total_payroll() == live_total, "scenario changed the live payroll"
+        assert [emp.to_dict() for emp in company._employees.values()] == live_state, "scenario changed employees"
+        print(f"{size:>10,} {scenarios:>10} {per_scenario * 1000:>11.1f}ms {1 / per_scenario:>11.1f} {changed:>9,}")
+    print("Incremental totals match a full recompute; the live company is untouched.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Employee Management System benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 200_000])
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}))
+    args = parser.parse_args()
+    bench_snapshot_formats(args.sizes)
+    bench_startup(args.sizes)
+    bench_update_latency(args.sizes)
+    bench_payroll(args.sizes)
+    bench_lookups(args.sizes)
+    bench_payslips(args.sizes, args.workers)
+    bench_bulk_update(args.sizes)
+    bench_scenarios(args.sizes)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,50 @@
+import bisect
+import gc
+import itertools
 import json
+import math
+import operator
+import os
+import struct
+import time
+import zlib
 from abc import ABC, abstractmethod
+from array import array
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date
 from typing import Optional
 
+try:
+    import numpy as np
+except ImportError:  # payroll falls back to array-based passes
+    np = None
+
+EmployeeType = namedtuple('EmployeeType', 'cls fields salary')
+
+# to_dict() 'type' -> EmployeeType
+EMPLOYEE_TYPES = {}
+
+def register_employee_type(type_name: str, *fields: str, salary=None):
+    """Class decorator registering an Employee subclass for loading and payroll.
+
+    `fields` are the numeric constructor arguments after employee_id, name
+    and department; each must be stored on the instance as `_<field>`. The
+    first one is the base pay that PayrollScenario.raise_pay() adjusts.
+    `salary`, if given, computes calculate_salary() from the fields in that
+    order and must also work element-wise on NumPy arrays; it lets payroll
+    runs keep the type in columns of its own.
+    """
+    def register(cls):
+        EMPLOYEE_TYPES[type_name] = EmployeeType(cls, fields, salary)
+        return cls
+    return register
+
 class Employee(ABC):
     def __init__(self, employee_id: str, name: str, department: str):
+        # Set by the owning Company; called as observer(employee, field, old, new)
+        # whenever a field changes, so only changed records need to be saved.
+        self._observer = None
         self._employee_id = employee_id
         self._name = name
         self._department = department
@@ -16,13 +57,25 @@ class Employee(ABC):
     def name(self) -> str:
         return self._name
 
+    @name.setter
+    def name(self, value: str):
+        old = self._name
+        self._name = value
+        self._changed('name', old, value)
+
     @property
     def department(self) -> str:
         return self._department
 
     @department.setter
     def department(self, value: str):
+        old = self._department
         self._department = value
+        self._changed('department', old, value)
+
+    def _changed(self, field: str, old, new) -> None:
+        if self._observer is not None:
+            self._observer(self, field, old, new)
 
     @abstractmethod
     def calculate_salary(self) -> float:
@@ -39,6 +92,30 @@ class Employee(ABC):
             'type': 'employee'
         }
 
+    @staticmethod
+    def from_dict(data: dict, trusted: bool = False) -> 'Employee':
+        """Build the registered Employee subclass for a to_dict() result.
+
+        The default path goes through the constructor and its validating
+        setters. trusted=True fills the instance attributes directly, which
+        is only safe for data this module wrote itself.
+        """
+        emp_type = data.get('type')
+        if emp_type not in EMPLOYEE_TYPES:
+            raise ValueError(f"Unknown employee type: {emp_type!r}.")
+        cls, fields, _ = EMPLOYEE_TYPES[emp_type]
+        if not trusted:
+            return cls(data['employee_id'], data['name'], data['department'], *[data[field] for field in fields])
+        emp = cls.__new__(cls)
+        emp._observer = None
+        emp._employee_id = data['employee_id']
+        emp._name = data['name']
+        emp._department = data['department']
+        for field in fields:
+            setattr(emp, '_' + field, data[field])
+        return emp
+
+@register_employee_type('fulltime', 'monthly_salary', salary=lambda monthly_salary: monthly_salary)
 class FullTimeEmployee(Employee):
     def __init__(self, employee_id: str, name: str, department: str, monthly_salary: float):
         super().__init__(employee_id, name, department)
@@ -53,7 +130,9 @@ class FullTimeEmployee(Employee):
     def monthly_salary(self, value: float):
         if value < 0:
             raise ValueError("Monthly salary cannot be negative.")
+        old = self._monthly_salary
         self._monthly_salary = value
+        self._changed('monthly_salary', old, value)
 
     def calculate_salary(self) -> float:
         return self.monthly_salary
@@ -70,6 +149,7 @@ class FullTimeEmployee(Employee):
         })
         return d
 
+@register_employee_type('parttime', 'hourly_rate', 'hours_worked_per_month', salary=operator.mul)
 class PartTimeEmployee(Employee):
     def __init__(self, employee_id: str, name: str, department: str, hourly_rate: float, hours_worked_per_month: float):
         super().__init__(employee_id, name, department)
@@ -86,7 +166,9 @@ class PartTimeEmployee(Employee):
     def hourly_rate(self, value: float):
         if value < 0:
             raise ValueError("Hourly rate cannot be negative.")
+        old = self._hourly_rate
         self._hourly_rate = value
+        self._changed('hourly_rate', old, value)
 
     @property
     def hours_worked_per_month(self) -> float:
@@ -96,7 +178,9 @@ class PartTimeEmployee(Employee):
     def hours_worked_per_month(self, value: float):
         if value < 0:
             raise ValueError("Hours worked per month cannot be negative.")
+        old = self._hours_worked_per_month
         self._hours_worked_per_month = value
+        self._changed('hours_worked_per_month', old, value)
 
     def calculate_salary(self) -> float:
         return self.hourly_rate * self.hours_worked_per_month
@@ -114,6 +198,7 @@ class PartTimeEmployee(Employee):
         })
         return d
 
+@register_employee_type('manager', 'monthly_salary', 'bonus', salary=operator.add)
 class Manager(FullTimeEmployee):
     def __init__(self, employee_id: str, name: str, department: str, monthly_salary: float, bonus: float):
         super().__init__(employee_id, name, department, monthly_salary)
@@ -128,7 +213,9 @@ class Manager(FullTimeEmployee):
     def bonus(self, value: float):
         if value < 0:
             raise ValueError("Bonus cannot be negative.")
+        old = self._bonus
         self._bonus = value
+        self._changed('bonus', old, value)
 
     def calculate_salary(self) -> float:
         return super().calculate_salary() + self.bonus
@@ -145,62 +232,532 @@ class Manager(FullTimeEmployee):
         })
         return d
 
+class _EmployeeSnapshot:
+    """Versioned, checksummed binary encoding of a list of employee dicts.
+
+    Layout (little-endian): magic, u16 version, u64 employee count, then a
+    type table (u8 type count and, prefixed by its u64 byte length, a
+    NUL-separated UTF-8 block of each type name followed by its fields, types
+    separated by an empty string), u8 type codes, one NUL-separated UTF-8
+    block of id/name/department (prefixed by its u64 byte length), the
+    registered pay fields of each employee as f64, a u8 per pay field that is
+    1 where the value was an int (so it reads back as one), then a CRC-32 of
+    everything after the magic.
+    """
+
+    MAGIC = b'EMPSNAP\x00'
+    VERSION = 1
+    _HEADER = struct.Struct('<HQ')
+    _LENGTH = struct.Struct('<Q')
+    _CRC = struct.Struct('<I')
+
+    @staticmethod
+    def check(data: dict) -> None:
+        """Raise ValueError if the employee dict cannot be stored in a snapshot."""
+        emp_type = data.get('type')
+        if emp_type not in EMPLOYEE_TYPES:
+            raise ValueError(f"Employee type {emp_type!r} is not registered.")
+        if any('\x00' in data[key] for key in ('employee_id', 'name', 'department')):
+            raise ValueError("Text fields cannot contain NUL characters.")
+        for field in EMPLOYEE_TYPES[emp_type].fields:
+            value = data[field]
+            if not isinstance(value, (int, float)):
+                raise ValueError(f"{field} must be a number to be stored in a binary snapshot.")
+            if isinstance(value, int) and abs(value) > 2 ** 53:
+                raise ValueError(f"{field} is too large to be stored exactly in a binary snapshot.")
+
+    @classmethod
+    def _encode(cls, strings: list) -> bytes:
+        encoded = '\x00'.join(strings).encode('utf-8')
+        return cls._LENGTH.pack(len(encoded)) + encoded
+
+    @classmethod
+    def write(cls, path: str, data_list: list):
+        for d in data_list:
+            cls.check(d)
+        type_codes = {}
+        for d in data_list:
+            type_codes.setdefault(d['type'], len(type_codes))
+        if len(type_codes) > 255:
+            raise ValueError("A snapshot holds at most 255 employee types.")
+        type_table = []
+        for emp_type in type_codes:
+            type_table += [emp_type, *EMPLOYEE_TYPES[emp_type].fields, '']
+        strings = [value for d in data_list for value in (d['employee_id'], d['name'], d['department'])]
+        pay = [d[field] for d in data_list for field in EMPLOYEE_TYPES[d['type']].fields]
+        payload = b''.join([
+            cls._HEADER.pack(cls.VERSION, len(data_list)),
+            bytes([len(type_codes)]),
+            cls._encode(type_table),
+            bytes(type_codes[d['type']] for d in data_list),
+            cls._encode(strings),
+            struct.pack(f'<{len(pay)}d', *pay),
+            bytes(isinstance(value, int) for value in pay),
+        ])
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(cls.MAGIC)
+            f.write(payload)
+            f.write(cls._CRC.pack(zlib.crc32(payload)))
+        os.replace(tmp_file, path)
+
+    @classmethod
+    def _decode(cls, payload, offset: int) -> tuple:
+        (length,) = cls._LENGTH.unpack_from(payload, offset)
+        offset += cls._LENGTH.size
+        return str(payload[offset:offset + length], 'utf-8').split('\x00'), offset + length
+
+    @classmethod
+    def read(cls, path: str) -> list:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:len(cls.MAGIC)] != cls.MAGIC:
+            raise ValueError("Not an employee snapshot file.")
+        payload = memoryview(data)[len(cls.MAGIC):-cls._CRC.size]
+        if zlib.crc32(payload) != cls._CRC.unpack_from(data, len(data) - cls._CRC.size)[0]:
+            raise ValueError("Snapshot checksum mismatch.")
+        version, count = cls._HEADER.unpack_from(payload, 0)
+        if version != cls.VERSION:
+            raise ValueError(f"Unsupported snapshot version {version}.")
+        type_count = payload[cls._HEADER.size]
+        table, offset = cls._decode(payload, cls._HEADER.size + 1)
+        types = []
+        for _ in range(type_count):
+            end = table.index('')
+            types.append((table[0], tuple(table[1:end])))
+            table = table[end + 1:]
+        codes = payload[offset:offset + count]
+        offset += count
+        strings, offset = cls._decode(payload, offset)
+        pay_count = sum(len(types[code][1]) for code in codes)
+        pay = struct.unpack_from(f'<{pay_count}d', payload, offset)
+        offset += 8 * pay_count
+        integer = payload[offset:offset + pay_count]
+        data_list = []
+        position = 0
+        for i in range(count):
+            emp_type, fields = types[codes[i]]
+            d = {'employee_id': strings[3 * i], 'name': strings[3 * i + 1], 'department': strings[3 * i + 2],
+                 'type': emp_type}
+            for field in fields:
+                d[field] = int(pay[position]) if integer[position] else pay[position]
+                position += 1
+            data_list.append(d)
+        return data_list
+
+class _PayrollGroup:
+    """Salary inputs of one employee type, one array per field."""
+
+    def __init__(self, fields: tuple):
+        self.fields = fields
+        self.ids = []
+        self.departments = array('q')
+        self.columns = {field: array('d') for field in fields}
+        self.shared = False  # arrays also used by a clone; copy them before writing
+
+    def clone(self) -> '_PayrollGroup':
+        group = _PayrollGroup.__new__(_PayrollGroup)
+        group.fields = self.fields
+        group.ids = self.ids
+        group.departments = self.departments
+        group.columns = dict(self.columns)
+        group.shared = self.shared = True
+        return group
+
+    def unshare(self) -> None:
+        if self.shared:
+            self.ids = list(self.ids)
+            self.departments = self.departments[:]
+            self.columns = {field: column[:] for field, column in self.columns.items()}
+            self.shared = False
+
+class _PayrollColumns:
+    """Salary inputs for every employee, stored column-wise per employee type.
+
+    Payroll runs compute a whole group's salaries in one pass over its
+    columns (with NumPy when it is installed) instead of calling
+    calculate_salary() on each object. The Company keeps the rows current
+    through its change observer.
+    """
+
+    def __init__(self, employees=()):
+        # One group per registered type with a salary formula, named after the
+        # type; any other Employee subclass goes to 'other', where its
+        # calculate_salary() result is cached.
+        self.groups = {name: _PayrollGroup(employee_type.fields) for name, employee_type in EMPLOYEE_TYPES.items()
+                       if employee_type.salary is not None}
+        self.groups['other'] = _PayrollGroup(('salary',))
+        self._class_groups = {EMPLOYEE_TYPES[name].cls: name for name in self.groups if name != 'other'}
+        self.department_names = []
+        self._department_codes = {}
+        self._rows = {}  # employee_id -> (group name, row)
+        self._rows_shared = False
+        for emp in employees:
+            self.add(emp)
+
+    def _department_code(self, department: str) -> int:
+        code = self._department_codes.get(department)
+        if code is None:
+            code = self._department_codes[department] = len(self.department_names)
+            self.department_names.append(department)
+        return code
+
+    def share(self) -> '_PayrollColumns':
+        """Return a copy-on-write clone: whichever side writes a group first copies it."""
+        clone = _PayrollColumns.__new__(_PayrollColumns)
+        clone.groups = {name: group.clone() for name, group in self.groups.items()}
+        clone._class_groups = self._class_groups
+        clone.department_names = list(self.department_names)
+        clone._department_codes = dict(self._department_codes)
+        clone._rows = self._rows
+        clone._rows_shared = self._rows_shared = True
+        return clone
+
+    def writable(self, name: str) -> _PayrollGroup:
+        group = self.groups[name]
+        group.unshare()
+        return group
+
+    def _writable_rows(self) -> dict:
+        if self._rows_shared:
+            self._rows = dict(self._rows)
+            self._rows_shared = False
+        return self._rows
+
+    def add(self, employee: Employee) -> None:
+        name = self._class_groups.get(type(employee), 'other')
+        group = self.writable(name)
+        self._writable_rows()[employee.employee_id] = (name, len(group.ids))
+        group.ids.append(employee.employee_id)
+        group.departments.append(self._department_code(employee.department))
+        if name == 'other':
+            group.columns['salary'].append(employee.calculate_salary())
+        else:
+            for field in group.fields:
+                group.columns[field].append(getattr(employee, field))
+
+    def remove(self, employee_id: str) -> None:
+        name, row = self._writable_rows().pop(employee_id)
+        group = self.writable(name)
+        last = len(group.ids) - 1
+        if row != last:
+            # Move the last row into the gap so the columns stay dense.
+            moved = group.ids[row] = group.ids[last]
+            group.departments[row] = group.departments[last]
+            for column in group.columns.values():
+                column[row] = column[last]
+            self._rows[moved] = (name, row)
+        group.ids.pop()
+        group.departments.pop()
+        for column in group.columns.values():
+            column.pop()
+
+    def update(self, employee: Employee, field: str, value) -> None:
+        entry = self._rows.get(employee.employee_id)
+        if entry is None:
+            return
+        name, row = entry
+        group = self.writable(name)
+        if field == 'department':
+            group.departments[row] = self._department_code(value)
+        elif name == 'other':
+            group.columns['salary'][row] = employee.calculate_salary()
+        elif field in group.columns:
+            group.columns[field][row] = value
+
+    @staticmethod
+    def _salaries(name: str, columns: dict):
+        """Salaries from a group's {field: values}, as arrays or NumPy arrays."""
+        salary = EMPLOYEE_TYPES[name].salary if name != 'other' else None
+        values = list(columns.values())
+        if np is not None:
+            values = [np.frombuffer(column) for column in values]
+            return values[0] if salary is None else salary(*values)
+        if salary is None:
+            return array('d', values[0])
+        return array('d', map(salary, *values))
+
+    def rows(self):
+        """Yield (employee_id, group name, salary) for every employee, group by group."""
+        for name, group in self.groups.items():
+            if group.ids:
+                yield from zip(group.ids, itertools.repeat(name), self._salaries(name, group.columns).tolist())
+
+    def totals(self) -> tuple:
+        """Return (total payroll, {department: (headcount, payroll)})."""
+        headcounts = [0] * len(self.department_names)
+        payrolls = [0.0] * len(self.department_names)
+        total = 0.0
+        for name, group in self.groups.items():
+            if not group.ids:
+                continue
+            salaries = self._salaries(name, group.columns)
+            if np is not None:
+                codes = np.frombuffer(group.departments, dtype=np.int64)
+                total += float(salaries.sum())
+                group_counts = np.bincount(codes, minlength=len(payrolls)).tolist()
+                group_payrolls = np.bincount(codes, weights=salaries, minlength=len(payrolls)).tolist()
+                for code, count in enumerate(group_counts):
+                    headcounts[code] += count
+                    payrolls[code] += group_payrolls[code]
+            else:
+                total += math.fsum(salaries)
+                for code, salary in zip(group.departments, salaries):
+                    headcounts[code] += 1
+                    payrolls[code] += salary
+        departments = {self.department_names[code]: (count, payrolls[code])
+                       for code, count in enumerate(headcounts) if count}
+        return total, departments
+
+_MONEY_FIELDS = ('monthly_salary', 'hourly_rate', 'bonus')
+
+def _render_payslip(period: str, data: dict, salary: float) -> str:
+    lines = [
+        f"PAYSLIP {period}",
+        f"Employee:   {data['name']} ({data['employee_id']})",
+        f"Department: {data['department']}",
+        f"Type:       {data.get('type', 'unknown').capitalize()}",
+        "-" * 40,
+    ]
+    for field, value in data.items():
+        if field in ('employee_id', 'name', 'department', 'type'):
+            continue
+        label = field.replace('_', ' ').capitalize()
+        amount = f"${value:,.2f}" if field in _MONEY_FIELDS else f"{value:,}"
+        lines.append(f"{label:<26}{amount:>14}")
+    lines.append("-" * 40)
+    lines.append(f"{'Net pay':<26}{f'${salary:,.2f}':>14}")
+    return '\n'.join(lines) + '\n'
+
+def _write_payslips(path: str, period: str, chunk: list) -> tuple:
+    """Render one chunk of (employee dict, salary) pairs into a file.
+
+    Runs in a worker process; returns (payslips, render seconds, write seconds).
+    """
+    start = time.perf_counter()
+    # Payslips in a file are separated by form feeds, one page each when printed.
+    document = '\f'.join(_render_payslip(period, data, salary) for data, salary in chunk)
+    rendered = time.perf_counter()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(document)
+    return len(chunk), rendered - start, time.perf_counter() - rendered
+
 class Company:
-    def __init__(self, data_file: str = 'employees.json'):
+    _settable = {}  # Employee subclass -> names of its properties with setters
+
+    def __init__(self, data_file: str = 'employees.json', snapshot_format: str = 'json', journal: bool = False,
+                 compact_every: int = 10000, validate_on_load: bool = False):
+        if snapshot_format not in ('json', 'binary'):
+            raise ValueError("Snapshot format must be 'json' or 'binary'.")
         self._employees = {}
         self._data_file = data_file
+        self._snapshot_format = snapshot_format
+        # Stored records were written by to_dict(), so by default they are
+        # loaded without re-running the setters' validation.
+        self._validate_on_load = validate_on_load
+        # In journal mode only employees added, changed or deleted since the last
+        # save are appended to the journal; the snapshot is rewritten by compact().
+        self._journal = journal
+        self._journal_file = data_file + '.journal'
+        self._compact_every = compact_every
+        self._journal_records = 0
+        self._dirty_ids = set()
+        self._deleted_ids = set()
+        self._payroll = None  # _PayrollColumns, built on the first payroll run
+        # department -> employee ids, and a sorted list of (normalized name
+        # suffix starting at a word, employee id) for prefix searches.
+        self._department_index = {}
+        self._name_index = []
         self._load_data()
 
+    def _on_employee_changed(self, employee: Employee, field: str, old, new) -> None:
+        self._dirty_ids.add(employee.employee_id)
+        if field == 'department':
+            self._department_index_remove(old, employee.employee_id)
+            self._department_index.setdefault(new, set()).add(employee.employee_id)
+        elif field == 'name':
+            self._name_index_remove(old, employee.employee_id)
+            for key in self._name_keys(new, employee.employee_id):
+                bisect.insort(self._name_index, key)
+        if self._payroll is not None:
+            self._payroll.update(employee, field, new)
+
+    def _track(self, employee: Employee) -> None:
+        employee._observer = self._on_employee_changed
+
+    @staticmethod
+    def _normalize_name(name: str) -> str:
+        return ' '.join(name.casefold().split())
+
+    @classmethod
+    def _name_keys(cls, name: str, employee_id: str) -> list:
+        words = cls._normalize_name(name).split(' ')
+        return [(' '.join(words[i:]), employee_id) for i in range(len(words))]
+
+    def _rebuild_indexes(self) -> None:
+        self._department_index = {}
+        name_keys = []
+        for employee_id, emp in self._employees.items():
+            self._department_index.setdefault(emp._department, set()).add(employee_id)
+            words = emp._name.casefold().split()
+            name_keys.append((' '.join(words), employee_id))
+            for i in range(1, len(words)):
+                name_keys.append((' '.join(words[i:]), employee_id))
+        name_keys.sort()
+        self._name_index = name_keys
+
+    def _index_employee(self, employee: Employee) -> None:
+        self._department_index.setdefault(employee.department, set()).add(employee.employee_id)
+        for key in self._name_keys(employee.name, employee.employee_id):
+            bisect.insort(self._name_index, key)
+
+    def _unindex_employee(self, employee: Employee) -> None:
+        self._department_index_remove(employee.department, employee.employee_id)
+        self._name_index_remove(employee.name, employee.employee_id)
+
+    def _department_index_remove(self, department: str, employee_id: str) -> None:
+        ids = self._department_index.get(department)
+        if ids is not None:
+            ids.discard(employee_id)
+            if not ids:
+                del self._department_index[department]
+
+    def _name_index_remove(self, name: str, employee_id: str) -> None:
+        for key in self._name_keys(name, employee_id):
+            i = bisect.bisect_left(self._name_index, key)
+            if i < len(self._name_index) and self._name_index[i] == key:
+                del self._name_index[i]
+
+    def _read_data_list(self) -> list:
+        if self._snapshot_format == 'binary':
+            return _EmployeeSnapshot.read(self._data_file)
+        with open(self._data_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
     def _load_data(self) -> None:
+        # Loading allocates long-lived objects and no cyclic garbage, so the
+        # collector's repeated passes over the growing heap are pure overhead.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            # A corrupt or truncated file is left to raise: starting empty
+            # would let the next save overwrite the employees it still holds.
+            try:
+                data_list = self._read_data_list()
+            except FileNotFoundError:
+                data_list = []
+            self._load_records(data_list)
+            if self._journal:
+                self._replay_journal()
+            observer = self._on_employee_changed
+            for emp in self._employees.values():
+                emp._observer = observer
+            self._rebuild_indexes()
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _load_records(self, data_list: list) -> None:
+        trusted = not self._validate_on_load
+        for data in data_list:
+            if data.get('type') not in EMPLOYEE_TYPES:
+                continue
+            try:
+                emp = Employee.from_dict(data, trusted)
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Error loading employee: {e}")
+                continue
+            self._employees[emp.employee_id] = emp
+
+    def _replay_journal(self) -> None:
+        valid_length = 0
         try:
-            with open(self._data_file, 'r', encoding='utf-8') as f:
-                data_list = json.load(f)
-                for data in data_list:
-                    emp_type = data.get('type')
-                    try:
-                        if emp_type == 'fulltime':
-                            emp = FullTimeEmployee(
-                                employee_id=data['employee_id'],
-                                name=data['name'],
-                                department=data['department'],
-                                monthly_salary=data['monthly_salary']
-                            )
-                        elif emp_type == 'parttime':
-                            emp = PartTimeEmployee(
-                                employee_id=data['employee_id'],
-                                name=data['name'],
-                                department=data['department'],
-                                hourly_rate=data['hourly_rate'],
-                                hours_worked_per_month=data['hours_worked_per_month']
-                            )
-                        elif emp_type == 'manager':
-                            emp = Manager(
-                                employee_id=data['employee_id'],
-                                name=data['name'],
-                                department=data['department'],
-                                monthly_salary=data['monthly_salary'],
-                                bonus=data['bonus']
-                            )
-                        else:
-                            continue
-                        self._employees[emp.employee_id] = emp
-                    except Exception as e:
-                        print(f"Error loading employee: {e}")
-                        continue
+            with open(self._journal_file, 'rb') as f:
+                lines = f.readlines()
         except FileNotFoundError:
-            self._employees = {}
+            return
+        for line in lines:
+            # Only newline-terminated lines that parse were fully written; a
+            # crash during _save_changes can leave one partial line at the end.
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError("record has no line end")
+                record = json.loads(line)
+            except ValueError:
+                print("Ignoring incomplete journal record.")
+                break
+            for employee_id, data in record.get('employees', {}).items():
+                if data is None:
+                    self._employees.pop(employee_id, None)
+                else:
+                    self._load_records([data])
+            valid_length += len(line)
+            self._journal_records += 1
+        if valid_length < sum(len(line) for line in lines):
+            # Cut the partial line off before _save_changes appends after it.
+            with open(self._journal_file, 'r+b') as f:
+                f.truncate(valid_length)
 
     def _save_data(self) -> None:
         data_list = [emp.to_dict() for emp in self._employees.values()]
-        with open(self._data_file, 'w', encoding='utf-8') as f:
-            json.dump(data_list, f, indent=2)
+        if self._snapshot_format == 'binary':
+            _EmployeeSnapshot.write(self._data_file, data_list)
+        else:
+            tmp_file = self._data_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data_list, f, indent=2)
+            os.replace(tmp_file, self._data_file)
+        self._dirty_ids.clear()
+        self._deleted_ids.clear()
+
+    def _save_changes(self) -> None:
+        """Persist employees added, changed or deleted since the last save."""
+        if not self._journal:
+            self._save_data()
+            return
+        changes = {employee_id: None for employee_id in self._deleted_ids}
+        for employee_id in self._dirty_ids:
+            emp = self._employees.get(employee_id)
+            if emp is not None:
+                changes[employee_id] = emp.to_dict()
+        self._dirty_ids.clear()
+        self._deleted_ids.clear()
+        if not changes:
+            return
+        with open(self._journal_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'employees': changes}, separators=(',', ':')) + '\n')
+        self._journal_records += 1
+        if self._journal_records >= self._compact_every:
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the snapshot with every employee and truncate the journal."""
+        self._save_data()
+        if self._journal:
+            # The snapshot already holds every journaled change. Should we crash
+            # before the journal is emptied, replaying it again on load just
+            # rewrites each employee with the same full record.
+            open(self._journal_file, 'w', encoding='utf-8').close()
+            self._journal_records = 0
 
     def add_employee(self, employee: Employee) -> bool:
         if employee.employee_id in self._employees:
             print(f"Employee with ID {employee.employee_id} already exists.")
             return False
+        if self._snapshot_format == 'binary':
+            try:
+                _EmployeeSnapshot.check(employee.to_dict())
+            except ValueError as e:
+                print(f"Cannot add employee {employee.employee_id}: {e}")
+                return False
         self._employees[employee.employee_id] = employee
-        self._save_data()
+        self._track(employee)
+        self._index_employee(employee)
+        if self._payroll is not None:
+            self._payroll.add(employee)
+        self._dirty_ids.add(employee.employee_id)
+        self._deleted_ids.discard(employee.employee_id)
+        self._save_changes()
         print(f"Employee {employee.name} added successfully.")
         return True
 
@@ -227,22 +784,148 @@ class Company:
                     employee.bonus = value
                 else:
                     print(f"Warning: Attribute '{key}' not found or not applicable for employee ID {employee_id}.")
-            self._save_data()
+            self._save_changes()
             print(f"Employee {employee_id} updated successfully.")
             return True
         except ValueError as e:
             print(f"Error updating employee {employee_id}: {e}")
             return False
 
+    @classmethod
+    def _settable_fields(cls, employee_type: type) -> frozenset:
+        fields = cls._settable.get(employee_type)
+        if fields is None:
+            fields = cls._settable[employee_type] = frozenset(
+                name for klass in employee_type.__mro__ for name, attr in vars(klass).items()
+                if isinstance(attr, property) and attr.fset is not None)
+        return fields
+
+    def bulk_update(self, changes: dict) -> bool:
+        """Apply {employee_id: {field: value}} to many employees and persist once.
+
+        Values go through the property setters, so the usual validation
+        applies. If any employee or field is unknown, or any value is
+        rejected, every change already made is rolled back and nothing is
+        saved.
+        """
+        for employee_id, fields in changes.items():
+            employee = self._employees.get(employee_id)
+            if employee is None:
+                print(f"Bulk update rejected: employee with ID {employee_id} not found.")
+                return False
+            unknown = fields.keys() - self._settable_fields(type(employee))
+            if unknown:
+                print(f"Bulk update rejected: {', '.join(sorted(unknown))} not applicable for employee ID {employee_id}.")
+                return False
+        dirty_before = set(self._dirty_ids)
+        applied = []  # (employee, field, old value), undone in reverse on failure
+        try:
+            for employee_id, fields in changes.items():
+                employee = self._employees[employee_id]
+                for field, value in fields.items():
+                    old = getattr(employee, field)
+                    setattr(employee, field, value)
+                    applied.append((employee, field, old))
+        except (TypeError, ValueError) as e:
+            for employee, field, old in reversed(applied):
+                setattr(employee, field, old)
+            self._dirty_ids = dirty_before
+            print(f"Bulk update rejected for employee ID {employee_id}: {e}")
+            return False
+        self._save_changes()
+        print(f"Updated {len(changes)} employees.")
+        return True
+
     def delete_employee(self, employee_id: str) -> bool:
         if employee_id in self._employees:
-            del self._employees[employee_id]
-            self._save_data()
+            employee = self._employees.pop(employee_id)
+            employee._observer = None
+            self._unindex_employee(employee)
+            if self._payroll is not None:
+                self._payroll.remove(employee_id)
+            self._dirty_ids.discard(employee_id)
+            self._deleted_ids.add(employee_id)
+            self._save_changes()
             print(f"Employee {employee_id} deleted successfully.")
             return True
         print(f"Employee with ID {employee_id} not found.")
         return False
 
+    def search_employees_by_name(self, name: str) -> list:
+        """Return employees with a name word starting with `name`, case-insensitively.
+
+        "smi", "ava" and "ava sm" all match "Ava Smith".
+        """
+        prefix = self._normalize_name(name)
+        if not prefix:
+            return []
+        matches = {}
+        i = bisect.bisect_left(self._name_index, (prefix,))
+        while i < len(self._name_index) and self._name_index[i][0].startswith(prefix):
+            employee_id = self._name_index[i][1]
+            matches[employee_id] = self._employees[employee_id]
+            i += 1
+        return list(matches.values())
+
+    def employees_in_department(self, department: str) -> list:
+        return [self._employees[employee_id] for employee_id in sorted(self._department_index.get(department, ()))]
+
+    def generate_payslips(self, output_dir: str, period: Optional[str] = None, workers: Optional[int] = None,
+                          chunk_size: int = 2000) -> dict:
+        """Render a payslip for every employee into output_dir, chunk_size per file.
+
+        Chunks are streamed to a pool of `workers` processes (default: one per
+        core; 1 renders in this process) with at most two chunks per worker in
+        flight. Returns the payslip and file counts, payslips per second and
+        the seconds spent extracting, rendering and writing.
+        """
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be at least 1.")
+        period = period or date.today().strftime('%Y-%m')
+        workers = workers or os.cpu_count() or 1
+        os.makedirs(output_dir, exist_ok=True)
+        stats = {'payslips': 0, 'files': 0, 'extract': 0.0, 'render': 0.0, 'write': 0.0}
+        start = time.perf_counter()
+
+        def chunks():
+            employees = iter(list(self._employees.values()))
+            for number in itertools.count(1):
+                extract_start = time.perf_counter()
+                chunk = [(emp.to_dict(), emp.calculate_salary()) for emp in itertools.islice(employees, chunk_size)]
+                stats['extract'] += time.perf_counter() - extract_start
+                if not chunk:
+                    return
+                yield os.path.join(output_dir, f"payslips-{period}-{number:05d}.txt"), chunk
+
+        def collect(result):
+            count, render_time, write_time = result
+            stats['payslips'] += count
+            stats['files'] += 1
+            stats['render'] += render_time
+            stats['write'] += write_time
+
+        if workers == 1:
+            for path, chunk in chunks():
+                collect(_write_payslips(path, period, chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = set()
+                for path, chunk in chunks():
+                    pending.add(pool.submit(_write_payslips, path, period, chunk))
+                    if len(pending) >= 2 * workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            collect(future.result())
+                for future in pending:
+                    collect(future.result())
+        stats['seconds'] = time.perf_counter() - start
+        stats['payslips_per_second'] = stats['payslips'] / stats['seconds'] if stats['seconds'] else 0.0
+        return stats
+
+    def what_if(self) -> 'PayrollScenario':
+        """Start a payroll scenario that never changes this company."""
+        return PayrollScenario(self)
+
     def list_employees(self) -> None:
         if not self._employees:
             print("No employees in the system.")
@@ -252,9 +935,199 @@ class Company:
             print(emp.display_details())
         print("-------------------------")
 
+    def _payroll_columns(self) -> _PayrollColumns:
+        if self._payroll is None:
+            self._payroll = _PayrollColumns(self._employees.values())
+        return self._payroll
+
     def calculate_total_payroll(self) -> float:
-        total_payroll = sum(emp.calculate_salary() for emp in self._employees.values())
-        return total_payroll
+        return self._payroll_columns().totals()[0]
+
+    def department_payroll(self) -> dict:
+        """Return {department: (headcount, monthly payroll)}."""
+        return self._payroll_columns().totals()[1]
+
+    def generate_payroll_report(self) -> None:
+        payroll = self._payroll_columns()
+        total_payroll, departments = payroll.totals()
+        print("Payroll Report:")
+        print("-" * 60)
+        print(f"{'ID':<12} {'Name':<25} {'Type':<10} {'Salary':>10}")
+        print("-" * 60)
+        for employee_id, group, salary in payroll.rows():
+            emp = self._employees[employee_id]
+            emp_type = (emp.to_dict().get('type', 'Unknown') if group == 'other' else group).capitalize()
+            print(f"{employee_id:<12} {emp.name:<25} {emp_type:<10} ${salary:>10,.2f}")
+        print("-" * 60)
+        print(f"{'Department':<38} {'Headcount':>9} {'Payroll':>11}")
+        for department, (headcount, department_total) in sorted(departments.items()):
+            print(f"{department:<38} {headcount:>9,} ${department_total:>10,.2f}")
+        print("-" * 60)
+        print(f"{'Total Payroll:':<49} ${total_payroll:>10,.2f}")
+
+class PayrollScenario:
+    """What-if view of a Company's payroll that never changes the company.
+
+    Rules work on a copy-on-write clone of the company's payroll columns,
+    so a group's arrays are only copied once either side writes to them.
+    Each rule touches just the matching rows and adjusts the running totals
+    by their salary difference. Nothing is ever saved.
+    """
+
+    def __init__(self, company: 'Company'):
+        self._payroll = company._payroll_columns().share()
+        # The arrays as they were when the scenario started, for changes().
+        self._base = {name: (group.departments, dict(group.columns)) for name, group in self._payroll.groups.items()}
+        self._total, departments = self._payroll.totals()
+        self._headcounts = [0] * len(self._payroll.department_names)
+        self._payrolls = [0.0] * len(self._payroll.department_names)
+        for department, (headcount, payroll) in departments.items():
+            code = self._payroll._department_codes[department]
+            self._headcounts[code] = headcount
+            self._payrolls[code] = payroll
+
+    @staticmethod
+    def _row_salaries(name: str, group: _PayrollGroup, rows):
+        if np is not None:
+            return _PayrollColumns._salaries(name, {field: np.frombuffer(column)[rows]
+                                                    for field, column in group.columns.items()})
+        return _PayrollColumns._salaries(name, {field: [column[row] for row in rows]
+                                                for field, column in group.columns.items()})
+
+    def _department_code(self, department: str) -> int:
+        code = self._payroll._department_code(department)
+        while len(self._payrolls) <= code:
+            self._headcounts.append(0)
+            self._payrolls.append(0.0)
+        return code
+
+    def _apply(self, name: str, field: str, department: Optional[str], value, where=None) -> int:
+        """Set `field` on the group's rows in `department` (all if None) for which where(old) holds.
+
+        `value` is the new value or a function of the old one; it and
+        `where` must accept floats as well as NumPy arrays. Returns the
+        number of rows changed.
+        """
+        group = self._payroll.groups[name]
+        code = None
+        if department is not None:
+            code = self._payroll._department_codes.get(department)
+            if code is None:
+                return 0
+        if np is not None:
+            values = np.frombuffer(group.columns[field])
+            if code is None:
+                mask = np.ones(len(values), dtype=bool)
+            else:
+                mask = np.frombuffer(group.departments, dtype=np.int64) == code
+            if where is not None:
+                mask &= where(values)
+            rows = np.flatnonzero(mask)
+            new_values = value(values[rows]) if callable(value) else np.full(len(rows), float(value))
+            negative = bool((new_values < 0).any())
+        else:
+            column = group.columns[field]
+            rows = [row for row, (row_code, old) in enumerate(zip(group.departments, column))
+                    if (code is None or row_code == code) and (where is None or where(old))]
+            new_values = [value(column[row]) if callable(value) else float(value) for row in rows]
+            negative = any(new < 0 for new in new_values)
+        if negative:
+            raise ValueError(f"{field.replace('_', ' ').capitalize()} cannot be negative.")
+        if not len(rows):
+            return 0
+        old_salaries = self._row_salaries(name, group, rows)
+        group = self._payroll.writable(name)
+        if np is not None:
+            np.frombuffer(group.columns[field])[rows] = new_values
+            deltas = self._row_salaries(name, group, rows) - old_salaries
+            codes = np.frombuffer(group.departments, dtype=np.int64)[rows]
+            self._total += float(deltas.sum())
+            by_code = np.bincount(codes, weights=deltas, minlength=len(self._payrolls)).tolist()
+            for row_code, delta in enumerate(by_code):
+                self._payrolls[row_code] += delta
+        else:
+            column = group.columns[field]
+            for row, new in zip(rows, new_values):
+                column[row] = new
+            for row, old, new in zip(rows, old_salaries, self._row_salaries(name, group, rows)):
+                self._total += new - old
+                self._payrolls[group.departments[row]] += new - old
+        return len(rows)
+
+    def update(self, employee_id: str, **fields) -> None:
+        """Change one employee's department or pay fields in the scenario."""
+        entry = self._payroll._rows.get(employee_id)
+        if entry is None:
+            raise ValueError(f"Employee with ID {employee_id} not found.")
+        name, row = entry
+        group = self._payroll.groups[name]
+        allowed = {'department'} if name == 'other' else {'department', *group.fields}
+        unknown = fields.keys() - allowed
+        if unknown:
+            raise ValueError(f"{', '.join(sorted(unknown))} not applicable for employee ID {employee_id}.")
+        for field, value in fields.items():
+            if field != 'department' and value < 0:
+                raise ValueError(f"{field.replace('_', ' ').capitalize()} cannot be negative.")
+        old_code = group.departments[row]
+        old_salary = float(self._row_salaries(name, group, [row])[0])
+        group = self._payroll.writable(name)
+        for field, value in fields.items():
+            if field == 'department':
+                group.departments[row] = self._department_code(value)
+            else:
+                group.columns[field][row] = float(value)
+        new_code = group.departments[row]
+        new_salary = float(self._row_salaries(name, group, [row])[0])
+        self._total += new_salary - old_salary
+        self._headcounts[old_code] -= 1
+        self._payrolls[old_code] -= old_salary
+        self._headcounts[new_code] += 1
+        self._payrolls[new_code] += new_salary
+
+    def raise_pay(self, percent: float, department: Optional[str] = None, employee_type: Optional[str] = None) -> int:
+        """Raise monthly salaries (hourly rates for part-timers) by `percent`.
+
+        Returns the number of employees changed.
+        """
+        if employee_type is not None and employee_type not in EMPLOYEE_TYPES:
+            raise ValueError(f"Unknown employee type: {employee_type!r}.")
+        factor = 1 + percent / 100
+        cents = round if np is None else np.round
+        return sum(self._apply(name, group.fields[0], department, lambda old: cents(old * factor, 2))
+                   for name, group in self._payroll.groups.items()
+                   if name != 'other' and employee_type in (None, name))
+
+    def cap_bonus(self, cap: float, department: Optional[str] = None) -> int:
+        """Lower every manager bonus above `cap` to `cap`. Returns the number of managers changed."""
+        return self._apply('manager', 'bonus', department, cap, where=lambda old: old > cap)
+
+    def total_payroll(self) -> float:
+        return self._total
+
+    def department_payroll(self) -> dict:
+        """Return {department: (headcount, monthly payroll)}."""
+        return {department: (self._headcounts[code], self._payrolls[code])
+                for code, department in enumerate(self._payroll.department_names) if self._headcounts[code]}
+
+    def changes(self) -> dict:
+        """Return {employee_id: {field: scenario value}} for every changed employee."""
+        changes = {}
+        for name, group in self._payroll.groups.items():
+            base_departments, base_columns = self._base[name]
+            columns = [('department', group.departments, base_departments)]
+            columns += [(field, column, base_columns[field]) for field, column in group.columns.items()]
+            for field, column, base in columns:
+                if column is base:
+                    continue
+                if np is not None:
+                    rows = np.flatnonzero(np.frombuffer(column, dtype=column.typecode) !=
+                                          np.frombuffer(base, dtype=base.typecode)).tolist()
+                else:
+                    rows = [row for row, (new, old) in enumerate(zip(column, base)) if new != old]
+                for row in rows:
+                    value = self._payroll.department_names[column[row]] if field == 'department' else column[row]
+                    changes.setdefault(group.ids[row], {})[field] = value
+        return changes
 
 def main():
     company = Company()
@@ -267,7 +1140,11 @@ def main():
         print("4. Delete Employee")
         print("5. List All Employees")
         print("6. Calculate Total Payroll")
-        print("7. Exit")
+        print("7. Generate Payroll Report")
+        print("8. Search Employees by Name")
+        print("9. List Employees in Department")
+        print("10. Generate Payslips")
+        print("11. Exit")
 
         choice = input("Enter your choice: ")
 
@@ -337,6 +1214,39 @@ def main():
             print(f"\nTotal Monthly Payroll: ${total_payroll:,.2f}")
 
         elif choice == '7':
+            company.generate_payroll_report()
+
+        elif choice == '8':
+            name = input("Enter name to search: ")
+            matches = company.search_employees_by_name(name)
+            if matches:
+                print(f"\n--- {len(matches)} employee(s) found ---")
+                for emp in matches:
+                    print(emp.display_details())
+            else:
+                print("No employees found with that name.")
+
+        elif choice == '9':
+            department = input("Enter Department: ")
+            members = company.employees_in_department(department)
+            if members:
+                print(f"\n--- {department} ({len(members)} employees) ---")
+                for emp in members:
+                    print(emp.display_details())
+            else:
+                print("No employees in that department.")
+
+        elif choice == '10':
+            output_dir = input("Enter output directory for payslips: ").strip() or 'payslips'
+            try:
+                stats = company.generate_payslips(output_dir)
+            except OSError as e:
+                print(f"Error writing payslips: {e}")
+                continue
+            print(f"Wrote {stats['payslips']:,} payslips to {stats['files']} file(s) in {stats['seconds']:.2f}s "
+                  f"({stats['payslips_per_second']:,.0f}/s).")
+
+        elif choice == '11':
             print("Exiting Employee Management System.")
             break
 
@@ -357,13 +1267,6 @@ if __name__ == "__main__":
     def find_employee(self, employee_id: str) -> Optional[Employee]:
         return self._employees.get(employee_id)
 
-    def search_employees_by_name(self, name: str) -> list:
-        name_lower = name.lower()
-        return [emp for emp in self._employees.values() if name_lower in emp.name.lower()]
-
-    def calculate_total_payroll(self) -> float:
-        return sum(emp.calculate_salary() for emp in self._employees.values())
-
     def display_all_employees(self) -> None:
         if not self._employees:
             print("No employees found.")
@@ -371,19 +1274,6 @@ if __name__ == "__main__":
         for emp in self._employees.values():
             print(emp.display_details())
 
-    def generate_payroll_report(self) -> None:
-        print("Payroll Report:")
-        print("-" * 60)
-        print(f"{'ID':<12} {'Name':<25} {'Type':<10} {'Salary':>10}")
-        print("-" * 60)
-        for emp in self._employees.values():
-            emp_type = emp.to_dict().get('type', 'Unknown').capitalize()
-            salary = emp.calculate_salary()
-            print(f"{emp.employee_id:<12} {emp.name:<25} {emp_type:<10} ${salary:>10,.2f}")
-        print("-" * 60)
-        total_payroll = self.calculate_total_payroll()
-        print(f"{'Total Payroll:':<49} ${total_payroll:>10,.2f}")
-
 def main():
     company = Company()
 
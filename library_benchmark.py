@@ -0,0 +1,296 @@
+import argparse
+import contextlib
+import csv
+import gc
+import json
+import threading
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from library_management import Book, JsonFileStorage, Library, Member, _record_dicts
+
+SYLLABLES = [
+    "ka", "lo", "mer", "dan", "vi", "tor", "sel", "ra", "quin", "bel", "shi", "mon", "gra", "pel", "zu", "ith",
+    "ow", "fen", "dri", "ax", "jo", "nu", "hal", "ess", "cor", "ym", "bri", "tas", "ul", "wen", "gor", "iv",
+]
+# A few thousand pseudo-words so title selectivity resembles a real catalogue.
+WORDS = sorted(random.Random(1).sample([a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES], 5000))
+SURNAMES = [word.capitalize() + suffix for word in WORDS[::7] for suffix in ("", "son", "ez", "ski")]
+
+def make_books(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    for i in range(count):
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).title()
+        author = f"{rng.choice(SURNAMES)} {rng.choice(SURNAMES)}"
+        yield Book(title, author, f"{978000000000 + i}", rng.randint(1800, 2025), rng.randint(1, 5))
+
+def empty_library(**kwargs) -> Library:
+    path = os.path.join(tempfile.mkdtemp(), "library_data.json")
+    return Library(path, **kwargs)
+
+def linear_search(library: Library, query: str, search_by: str):
+    # The original implementation of Library.search_book, kept for comparison.
+    query_lower = query.lower()
+    results = []
+    for book in library.books.values():
+        if search_by == 'title' and query_lower in book.title.lower():
+            results.append(book)
+        elif search_by == 'author' and query_lower in book.author.lower():
+            results.append(book)
+    return results
+
+def bench_search(sizes, queries: int = 200):
+    print("\n--- search_book: trigram index vs linear scan ---")
+    print(f"{'Books':>10} {'Index build':>12} {'Scan/query':>12} {'Index/query':>12} {'Speedup':>9}")
+    rng = random.Random(7)
+    for size in sizes:
+        library = empty_library()
+        for book in make_books(size):
+            library.books[book.isbn] = book
+        workload = []
+        for _ in range(queries):
+            if rng.random() < 0.5:
+                word = rng.choice(WORDS)
+                start = rng.randint(0, len(word) - 3)
+                workload.append((word[start:start + rng.randint(3, len(word) - start)], 'title'))
+            else:
+                workload.append((rng.choice(SURNAMES)[:rng.randint(4, 8)], 'author'))
+
+        start = time.perf_counter()
+        library.search_book(WORDS[0])
+        build_time = time.perf_counter() - start
+        gc.collect()  # keep a collection of the freshly built index out of the timings
+
+        scan_queries = workload[:max(1, queries // 10)]
+        start = time.perf_counter()
+        for query, search_by in scan_queries:
+            linear_search(library, query, search_by)
+        scan_time = (time.perf_counter() - start) / len(scan_queries)
+
+        start = time.perf_counter()
+        for query, search_by in workload:
+            library.search_book(query, search_by, limit=20)
+        index_time = (time.perf_counter() - start) / len(workload)
+
+        print(f"{size:>10,} {build_time:>11.2f}s {scan_time * 1000:>10.2f}ms {index_time * 1000:>10.2f}ms {scan_time / index_time:>8.1f}x")
+
+def write_library_file(size: int) -> str:
+    library = empty_library()
+    for book in make_books(size):
+        library.books[book.isbn] = book
+    isbns = list(library.books)
+    rng = random.Random(3)
+    for i in range(size // 10):
+        member = Member(f"M{i:07d}", f"Member {i}", f"member{i}@example.com")
+        member.borrowed_books = [(isbn, "2024-01-15T10:30:00") for isbn in rng.sample(isbns, rng.randint(0, 3))]
+        library.members[member.member_id] = member
+    library.compact()
+    return library.data_file
+
+def measure_startup(path: str, lazy: bool):
+    gc.collect()
+    start = time.perf_counter()
+    Library(path, lazy=lazy)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    library = Library(path, lazy=lazy)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del library
+    return elapsed, retained, peak
+
+def bench_startup(sizes):
+    print("\n--- Library startup: eager json.load vs streaming lazy load ---")
+    print(f"{'Books':>10} {'Mode':>6} {'Startup':>9} {'Retained':>10} {'Peak':>10}")
+    for size in sizes:
+        path = write_library_file(size)
+        for lazy in (False, True):
+            elapsed, retained, peak = measure_startup(path, lazy)
+            mode = "lazy" if lazy else "eager"
+            print(f"{size:>10,} {mode:>6} {elapsed:>8.2f}s {retained / 2**20:>8.1f}MB {peak / 2**20:>8.1f}MB")
+
+def bench_bulk_import(rows: int, loop_rows: int = 500):
+    print("\n--- Catalogue import: bulk_add_books vs add_book loop ---")
+    path = os.path.join(tempfile.mkdtemp(), "acquisitions.csv")
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["title", "author", "isbn", "publication_year", "quantity"])
+        for book in make_books(rows):
+            writer.writerow([book.title, book.author, book.isbn, book.publication_year, book.quantity])
+
+    for journal in (False, True):
+        mode = "journal" if journal else "snapshot"
+        library = empty_library(journal=journal)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            for book in make_books(loop_rows):
+                library.add_book(book)
+            loop_time = time.perf_counter() - start
+        library.close()
+        print(f"add_book loop ({mode}):  {loop_rows:>10,} books in {loop_time:7.2f}s = {loop_rows / loop_time:>10,.0f} books/sec")
+
+    library = empty_library()
+    start = time.perf_counter()
+    library.import_books_csv(path)
+    bulk_time = time.perf_counter() - start
+    print(f"import_books_csv:          {rows:>10,} books in {bulk_time:7.2f}s = {rows / bulk_time:>10,.0f} books/sec")
+
+def check_circulation(library: Library):
+    """Assert that copies on the shelf plus copies on loan add up for every book."""
+    on_loan = {}
+    for member in library.members.values():
+        for isbn in member.loans:
+            on_loan[isbn] = on_loan.get(isbn, 0) + 1
+    for isbn, book in library.books.items():
+        assert 0 <= book.available_copies <= book.quantity, isbn
+        assert book.available_copies + on_loan.get(isbn, 0) == book.quantity, isbn
+        assert len(library._loan_index().get(isbn, {})) == on_loan.get(isbn, 0), isbn
+
+def bench_concurrent_circulation(thread_counts, books: int = 2000, members: int = 5000, ops_per_thread: int = 20000):
+    print("\n--- Concurrent circulation: per-book/per-member locks, batched background writes ---")
+    print(f"{'Threads':>8} {'Operations':>11} {'Checkouts':>10} {'Time':>8} {'Ops/sec':>10} {'Checkouts/sec':>14}")
+    for threads in thread_counts:
+        library = empty_library(journal=True, concurrent=True)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            library.bulk_add_books(make_books(books))
+            library.bulk_register_members(Member(f"M{i}", f"Member {i}", f"m{i}@example.com") for i in range(members))
+        isbns = list(library.books)
+        member_ids = list(library.members)
+        checkouts = [0] * threads
+
+        def desk(n: int):
+            rng = random.Random(n)
+            for _ in range(ops_per_thread):
+                # A small hot set of titles so desks actually contend for copies.
+                isbn = rng.choice(isbns[:50]) if rng.random() < 0.5 else rng.choice(isbns)
+                member_id = rng.choice(member_ids)
+                if rng.random() < 0.6:
+                    checkouts[n] += library.borrow_book(isbn, member_id)
+                else:
+                    library.return_book(isbn, member_id)
+
+        workers = [threading.Thread(target=desk, args=(n,)) for n in range(threads)]
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+            library.close()
+        check_circulation(library)
+        # Everything written by the background flusher must reload to the same state.
+        reloaded = Library(library.data_file, journal=True)
+        check_circulation(reloaded)
+        assert {isbn: book.available_copies for isbn, book in reloaded.books.items()} == \
+               {isbn: book.available_copies for isbn, book in library.books.items()}
+        reloaded.close()
+        total = sum(checkouts)
+        ops = threads * ops_per_thread
+        print(f"{threads:>8} {ops:>11,} {total:>10,} {elapsed:>7.2f}s {ops / elapsed:>10,.0f} {total / elapsed:>14,.0f}")
+    print("No lost updates: shelf + loans == quantity for every book, in memory and after reload.")
+
+class LegacyBook:
+    """The original dict-backed Book layout, kept for memory comparisons."""
+
+    def __init__(self, title, author, isbn, publication_year, quantity):
+        self.title = title
+        self.author = author
+        self.isbn = isbn
+        self.publication_year = publication_year
+        self.quantity = quantity
+        self.available_copies = quantity
+
+class LegacyMember:
+    """The original Member layout: a list of (isbn, ISO date string) tuples."""
+
+    def __init__(self, member_id, name, email):
+        self.member_id = member_id
+        self.name = name
+        self.email = email
+        self.borrowed_books = []
+
+def bytes_per_record(build, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    records = [build(i) for i in range(count)]
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    # Subtract the list holding the records.
+    return (used - 8 * count) / count
+
+def bench_record_memory(count: int = 100_000):
+    print("\n--- Record memory: dict-backed vs __slots__ with interned authors and integer loan dates ---")
+    rng = random.Random(5)
+    rows = [(book.title, book.author, book.isbn, book.publication_year, book.quantity) for book in make_books(count)]
+    loans = [[(rows[rng.randrange(count)][2], f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T10:30:00.{rng.randint(0, 999999):06d}")
+              for _ in range(3)] for _ in range(count)]
+
+    def parsed_row(i):
+        # Each author arrives as its own string object, as it does when parsed from a file.
+        title, author, isbn, year, quantity = rows[i]
+        return title, "".join(list(author)), isbn, year, quantity
+
+    legacy_book = bytes_per_record(lambda i: LegacyBook(*parsed_row(i)), count)
+    slotted_book = bytes_per_record(lambda i: Book(*parsed_row(i)), count)
+
+    def legacy_member(i):
+        member = LegacyMember(f"M{i:07d}", f"Member {i}", f"member{i}@example.com")
+        member.borrowed_books = [(isbn, "".join(list(date))) for isbn, date in loans[i]]
+        return member
+
+    def slotted_member(i):
+        member = Member(f"M{i:07d}", f"Member {i}", f"member{i}@example.com")
+        member.borrowed_books = loans[i]
+        return member
+
+    legacy_member_size = bytes_per_record(legacy_member, count)
+    slotted_member_size = bytes_per_record(slotted_member, count)
+    print(f"{'Record':<24} {'Before':>10} {'After':>10}")
+    print(f"{'Book':<24} {legacy_book:>9.0f}B {slotted_book:>9.0f}B")
+    print(f"{'Member (3 loans)':<24} {legacy_member_size:>9.0f}B {slotted_member_size:>9.0f}B")
+
+def bench_snapshot_formats(sizes):
+    print("\n--- Snapshot formats: pretty-printed JSON vs binary ---")
+    print(f"{'Books':>10} {'Format':>7} {'Save':>8} {'Load':>8} {'Size':>10}")
+    for size in sizes:
+        source = Library(write_library_file(size))
+        expected = json.dumps([_record_dicts(source.books), _record_dicts(source.members)], sort_keys=True)
+        directory = tempfile.mkdtemp()
+        for snapshot_format in ('json', 'binary'):
+            storage = JsonFileStorage(os.path.join(directory, f"library.{snapshot_format}"), snapshot_format=snapshot_format)
+            storage.books, storage.members = source.books, source.members
+            start = time.perf_counter()
+            storage.compact()
+            save_time = time.perf_counter() - start
+            gc.collect()
+            start = time.perf_counter()
+            loaded = Library(storage.data_file, snapshot_format=snapshot_format)
+            load_time = time.perf_counter() - start
+            # Round trip: both formats must reload to exactly the same records.
+            actual = json.dumps([_record_dicts(loaded.books), _record_dicts(loaded.members)], sort_keys=True)
+            assert actual == expected, f"{snapshot_format} snapshot did not round-trip"
+            file_size = os.path.getsize(storage.data_file)
+            print(f"{size:>10,} {snapshot_format:>7} {save_time:>7.2f}s {load_time:>7.2f}s {file_size / 2**20:>8.1f}MB")
+    print("Round trip: JSON and binary snapshots reload to identical books and members.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Library Management System benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--import-rows", type=int, default=1_000_000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    bench_search(args.sizes)
+    bench_startup(args.sizes)
+    bench_bulk_import(args.import_rows)
+    bench_concurrent_circulation(args.threads)
+    bench_record_memory()
+    bench_snapshot_formats(args.sizes)
+
+if __name__ == "__main__":
+    main()
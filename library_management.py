@@ -1,8 +1,37 @@
+import contextlib
+import csv
+import heapq
 import json
+import os
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from collections.abc import MutableMapping
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+LOAN_PERIOD = timedelta(days=14)
+
+# Loan dates are kept in memory as integer microseconds since the epoch
+# (naive local time), and converted to ISO strings only for storage and display.
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+def _to_timestamp(value) -> int:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return (value - _EPOCH) // _MICROSECOND
+
+def _from_timestamp(timestamp: int) -> datetime:
+    return _EPOCH + timestamp * _MICROSECOND
 
 class Book:
+    __slots__ = ('title', 'author', 'isbn', 'publication_year', 'quantity', 'available_copies')
+
     def __init__(self, title: str, author: str, isbn: str, publication_year: int, quantity: int):
         if not all([title, author, isbn, publication_year, quantity is not None]):
             raise ValueError("All book fields must be provided.")
@@ -12,7 +41,7 @@ class Book:
             raise ValueError("Quantity must be a non-negative integer.")
 
         self.title = title
-        self.author = author
+        self.author = sys.intern(author)  # many books share an author
         self.isbn = isbn
         self.publication_year = publication_year
         self.quantity = quantity
@@ -33,16 +62,29 @@ class Book:
 
     @classmethod
     def from_dict(cls, data: dict):
-        return cls(data['title'], data['author'], data['isbn'], data['publication_year'], data['quantity'])
+        book = cls(data['title'], data['author'], data['isbn'], data['publication_year'], data['quantity'])
+        book.available_copies = data.get('available_copies', book.quantity)
+        return book
 
 class Member:
+    __slots__ = ('member_id', 'name', 'email', 'loans')
+
     def __init__(self, member_id: str, name: str, email: str):
         if not all([member_id, name, email]):
             raise ValueError("All member fields must be provided.")
         self.member_id = member_id
         self.name = name
         self.email = email
-        self.borrowed_books = [] # List of (isbn, borrow_date)
+        self.loans = {} # isbn -> borrow timestamp (see _to_timestamp)
+
+    @property
+    def borrowed_books(self) -> List[tuple]:
+        """(isbn, ISO borrow date) pairs, as stored in the data file."""
+        return [(isbn, _from_timestamp(timestamp).isoformat()) for isbn, timestamp in self.loans.items()]
+
+    @borrowed_books.setter
+    def borrowed_books(self, entries):
+        self.loans = {isbn: _to_timestamp(borrow_date) for isbn, borrow_date in entries}
 
     def __str__(self):
         return f"Member ID: {self.member_id}, Name: {self.name}, Email: {self.email}"
@@ -61,147 +103,1193 @@ class Member:
         member.borrowed_books = data.get('borrowed_books', [])
         return member
 
-class Library:
-    def __init__(self, data_file: str = 'library_data.json'):
-        self.books = {}
-        self.members = {}
+class LazyRecordMap(MutableMapping):
+    """Dict of records that keeps raw JSON text and builds objects on first access."""
+
+    def __init__(self, record_type):
+        self._record_type = record_type
+        self._records = {}  # key -> record_type instance or raw JSON text
+
+    def set_raw(self, key: str, raw: str):
+        self._records[key] = raw
+
+    def __getitem__(self, key):
+        record = self._records[key]
+        if not isinstance(record, self._record_type):
+            record = self._records[key] = self._record_type.from_dict(json.loads(record))
+        return record
+
+    def __setitem__(self, key, record):
+        self._records[key] = record
+
+    def __delitem__(self, key):
+        del self._records[key]
+
+    def __contains__(self, key):
+        return key in self._records
+
+    def __iter__(self):
+        return iter(list(self._records))
+
+    def __len__(self):
+        return len(self._records)
+
+    def record_dicts(self):
+        """Yield (key, dict) pairs without materializing records that were never accessed."""
+        for key, record in list(self._records.items()):
+            if isinstance(record, self._record_type):
+                yield key, record.to_dict()
+            else:
+                yield key, json.loads(record)
+
+class _JsonStream:
+    """Incremental reader for one JSON document, read from a file in chunks."""
+
+    _WHITESPACE = re.compile(r'[ \t\n\r]*')
+    # An object with no nested objects (arrays and strings are fine), which is
+    # the shape of every Book and Member record.
+    # Written as unrolled loops (no nested quantifiers that can match the same
+    # text two ways), so a record cut off at the buffer edge fails in linear
+    # time without needing possessive quantifiers.
+    _STRING = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+    _FLAT_OBJECT = re.compile(r'\{[^{}"]*(?:' + _STRING + r'[^{}"]*)*\}')
+    _RECORD_ENTRY = re.compile(r'[ \t\n\r]*(' + _STRING + r')[ \t\n\r]*:[ \t\n\r]*'
+                               r'(' + _FLAT_OBJECT.pattern + r')[ \t\n\r]*(,?)')
+
+    def __init__(self, f, chunk_size: int = 1 << 20):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            self._pos = self._WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self._buf, self._pos)
+        self._pos += 1
+
+    def raw_record(self) -> str:
+        """Return the raw text of the next value, decoding it only if it is not a flat object."""
+        while self._peek() == '{':
+            match = self._FLAT_OBJECT.match(self._buf, self._pos)
+            if match:
+                self._pos = match.end()
+                return match.group()
+            if self._eof or not self._fill():
+                break
+        return self.value()[1]
+
+    def value(self):
+        """Decode the next value and return it together with its raw text."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # A value ending exactly at the buffer edge may be a truncated number.
+                if end < len(self._buf) or self._eof:
+                    raw = self._buf[self._pos:end]
+                    self._pos = end
+                    return value, raw
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def object_keys(self):
+        """Yield the keys of the object at the current position.
+
+        The caller must consume each key's value before advancing the iterator.
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key, _ = self.value()
+            self._expect(':')
+            yield key
+            if self._peek() == ',':
+                self._pos += 1
+                continue
+            self._expect('}')
+            return
+
+    def record_items(self):
+        """Yield (key, raw_text) for each entry of the object of records at the current position."""
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            match = self._RECORD_ENTRY.match(self._buf, self._pos)
+            if match is not None and (match.end() < len(self._buf) or self._eof):
+                # Fast path: one regex match per record, no decoding.
+                key_text = match.group(1)
+                key = key_text[1:-1] if '\\' not in key_text else json.loads(key_text)
+                self._pos = match.end()
+                yield key, match.group(2)
+                if match.group(3):
+                    continue
+            else:
+                # Entry straddles the buffer edge or is not a flat object.
+                key, _ = self.value()
+                self._expect(':')
+                yield key, self.raw_record()
+                if self._peek() == ',':
+                    self._pos += 1
+                    continue
+            self._expect('}')
+            return
+
+def _record_dicts(records) -> dict:
+    if isinstance(records, LazyRecordMap):
+        return dict(records.record_dicts())
+    return {key: record.to_dict() for key, record in list(records.items())}
+
+class TrigramIndex:
+    """Inverted index from lowercase character trigrams to the keys whose text contains them."""
+
+    def __init__(self):
+        self._postings = {}  # trigram -> set of keys
+        self._texts = {}  # key -> lowercased text
+
+    @staticmethod
+    def _trigrams(text: str) -> set:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, key: str, text: str):
+        if key in self._texts:
+            self.remove(key)
+        text = text.lower()
+        self._texts[key] = text
+        for gram in self._trigrams(text):
+            self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key: str):
+        text = self._texts.pop(key, None)
+        if text is None:
+            return
+        for gram in self._trigrams(text):
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """Return up to limit keys whose text contains query, best matches first."""
+        query = query.lower()
+        if len(query) < 3:
+            candidates = self._texts.keys()
+        else:
+            postings = []
+            for gram in self._trigrams(query):
+                keys = self._postings.get(gram)
+                if not keys:
+                    return []
+                postings.append(keys)
+            postings.sort(key=len)
+            candidates = postings[0].intersection(*postings[1:])
+        ranked = []
+        for key in candidates:
+            text = self._texts[key]
+            position = text.find(query)
+            if position != -1:
+                # Prefix matches first, then earlier matches, then shorter (closer) texts.
+                ranked.append((position, len(text), text, key))
+        if limit is None:
+            ranked.sort()
+        else:
+            ranked = heapq.nsmallest(limit, ranked)
+        return [key for _, _, _, key in ranked]
+
+class _BinarySnapshot:
+    """Versioned, checksummed binary encoding of all books and members.
+
+    Layout (little-endian): magic, u16 version, u64 book count, u64 member
+    count, u64 loan count, then column blocks, then a CRC-32 of everything
+    after the magic. Each string column is one NUL-separated UTF-8 block
+    prefixed by its u64 byte length, so a whole column decodes in one call;
+    numeric columns are packed arrays (loan dates as i64 timestamps).
+    """
+
+    MAGIC = b'LIBSNAP\x00'
+    VERSION = 1
+    _HEADER = struct.Struct('<HQQQ')
+    _LENGTH = struct.Struct('<Q')
+    _CRC = struct.Struct('<I')
+
+    @classmethod
+    def _pack_strings(cls, parts: list, values: list):
+        if any('\x00' in value for value in values):
+            raise ValueError("Text fields cannot contain NUL characters.")
+        encoded = '\x00'.join(values).encode('utf-8')
+        parts.append(cls._LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+
+    @classmethod
+    def encode(cls, books: dict, members: dict) -> bytes:
+        books, members = list(books.values()), list(members.values())
+        loans = [(isbn, timestamp) for member in members for isbn, timestamp in list(member.loans.items())]
+        parts = [cls._HEADER.pack(cls.VERSION, len(books), len(members), len(loans))]
+        cls._pack_strings(parts, [value for book in books for value in (book.isbn, book.title, book.author)])
+        parts.append(struct.pack(f'<{3 * len(books)}i', *[
+            value for book in books for value in (book.publication_year, book.quantity, book.available_copies)]))
+        cls._pack_strings(parts, [value for member in members for value in (member.member_id, member.name, member.email)])
+        parts.append(struct.pack(f'<{len(members)}I', *[len(member.loans) for member in members]))
+        cls._pack_strings(parts, [isbn for isbn, _ in loans])
+        parts.append(struct.pack(f'<{len(loans)}q', *[timestamp for _, timestamp in loans]))
+        payload = b''.join(parts)
+        return cls.MAGIC + payload + cls._CRC.pack(zlib.crc32(payload))
+
+    @staticmethod
+    def write(path: str, data: bytes):
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file, path)
+
+    @classmethod
+    def read(cls, path: str, books: dict, members: dict):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:len(cls.MAGIC)] != cls.MAGIC:
+            raise ValueError("Not a library snapshot file.")
+        payload = memoryview(data)[len(cls.MAGIC):-cls._CRC.size]
+        if zlib.crc32(payload) != cls._CRC.unpack_from(data, len(data) - cls._CRC.size)[0]:
+            raise ValueError("Snapshot checksum mismatch.")
+        version, book_count, member_count, loan_count = cls._HEADER.unpack_from(payload, 0)
+        if version != cls.VERSION:
+            raise ValueError(f"Unsupported snapshot version {version}.")
+        offset = cls._HEADER.size
+
+        def read_strings(count):
+            nonlocal offset
+            (length,) = cls._LENGTH.unpack_from(payload, offset)
+            start = offset + cls._LENGTH.size
+            offset = start + length
+            return str(payload[start:offset], 'utf-8').split('\x00') if count else []
+
+        def read_numbers(code, count):
+            nonlocal offset
+            values = struct.unpack_from(f'<{count}{code}', payload, offset)
+            offset += struct.calcsize(f'<{count}{code}')
+            return values
+
+        book_strings = read_strings(3 * book_count)
+        book_numbers = read_numbers('i', 3 * book_count)
+        member_strings = read_strings(3 * member_count)
+        loan_counts = read_numbers('I', member_count)
+        loan_isbns = read_strings(loan_count)
+        loan_dates = read_numbers('q', loan_count)
+
+        # The checksum has verified the data was written by write(), so the
+        # records are filled in directly rather than re-validated.
+        for i in range(book_count):
+            book = Book.__new__(Book)
+            book.isbn, book.title, author = book_strings[3 * i:3 * i + 3]
+            book.author = sys.intern(author)
+            book.publication_year, book.quantity, book.available_copies = book_numbers[3 * i:3 * i + 3]
+            books[book.isbn] = book
+        loan = 0
+        for i in range(member_count):
+            member = Member.__new__(Member)
+            member.member_id, member.name, member.email = member_strings[3 * i:3 * i + 3]
+            end = loan + loan_counts[i]
+            member.loans = dict(zip(loan_isbns[loan:end], loan_dates[loan:end]))
+            loan = end
+            members[member.member_id] = member
+
+class LibraryStorage(ABC):
+    """Where a Library keeps its books and members.
+
+    load() returns the books and members mappings that the Library works on;
+    apply() persists changed records, given as key -> to_dict() data, with None
+    meaning the key was deleted. Code that reads every live record, such as a
+    full snapshot, does so inside snapshot_lock(), which a concurrent Library
+    replaces with one holding all of its record locks.
+    """
+
+    snapshot_lock = staticmethod(contextlib.nullcontext)
+
+    @abstractmethod
+    def load(self) -> Tuple[MutableMapping, MutableMapping]:
+        pass
+
+    @abstractmethod
+    def apply(self, books: dict, members: dict):
+        pass
+
+    @abstractmethod
+    def active_loans(self) -> Iterator[Tuple[str, str, str]]:
+        """Yield (member_id, isbn, borrow_date) for every book currently on loan."""
+        pass
+
+    def search(self, query: str, search_by: str, limit: Optional[int], offset: int) -> Optional[List[str]]:
+        """Return ranked ISBNs, or None to let the Library search its own index."""
+        return None
+
+    def compact(self):
+        pass
+
+    def close(self):
+        pass
+
+class JsonFileStorage(LibraryStorage):
+    """Single snapshot file, rewritten on every change.
+
+    The snapshot is pretty-printed JSON by default; snapshot_format='binary'
+    selects the compact _BinarySnapshot encoding instead.
+    """
+
+    def __init__(self, data_file: str = 'library_data.json', lazy: bool = False, snapshot_format: str = 'json'):
+        if snapshot_format not in ('json', 'binary'):
+            raise ValueError("Snapshot format must be 'json' or 'binary'.")
+        if lazy and snapshot_format != 'json':
+            raise ValueError("Lazy loading is only supported for JSON snapshots.")
+        # In lazy mode the data file is streamed record by record and Book/Member
+        # objects are only built when first accessed.
         self.data_file = data_file
-        self._load_data()
+        self.lazy = lazy
+        self.snapshot_format = snapshot_format
+        self.books = LazyRecordMap(Book) if lazy else {}
+        self.members = LazyRecordMap(Member) if lazy else {}
 
-    def _load_data(self):
+    def load(self) -> Tuple[MutableMapping, MutableMapping]:
+        if self.snapshot_format == 'binary':
+            try:
+                _BinarySnapshot.read(self.data_file, self.books, self.members)
+            except FileNotFoundError:
+                pass # No data file yet, start with empty library
+            except (ValueError, struct.error) as e:
+                print(f"Error reading snapshot: {e} Starting with empty library.")
+                self.books.clear()
+                self.members.clear()
+            return self.books, self.members
         try:
             with open(self.data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                for isbn, book_data in data.get('books', {}).items():
-                    book = Book.from_dict(book_data)
-                    self.books[isbn] = book
-                for member_id, member_data in data.get('members', {}).items():
-                    member = Member.from_dict(member_data)
-                    self.members[member_id] = member
+                if self.lazy:
+                    self._stream_records(f)
+                else:
+                    data = json.load(f)
+                    for isbn, book_data in data.get('books', {}).items():
+                        book = Book.from_dict(book_data)
+                        self.books[isbn] = book
+                    for member_id, member_data in data.get('members', {}).items():
+                        member = Member.from_dict(member_data)
+                        self.members[member_id] = member
         except FileNotFoundError:
             pass # No data file yet, start with empty library
         except json.JSONDecodeError:
             print("Error decoding JSON from data file. Starting with empty library.")
+            self.books.clear()
+            self.members.clear()
+        return self.books, self.members
+
+    def _stream_records(self, f):
+        stream = _JsonStream(f)
+        sections = {'books': self.books, 'members': self.members}
+        for section in stream.object_keys():
+            records = sections.get(section)
+            if records is None:
+                stream.value()
+                continue
+            for key, raw in stream.record_items():
+                records.set_raw(key, raw)
+
+    def active_loans(self) -> Iterator[Tuple[str, str, str]]:
+        if isinstance(self.members, LazyRecordMap):
+            for member_id, data in self.members.record_dicts():
+                for isbn, borrow_date in data.get('borrowed_books', []):
+                    yield member_id, isbn, borrow_date
+        else:
+            for member_id, member in self.members.items():
+                for isbn, borrow_date in member.borrowed_books:
+                    yield member_id, isbn, borrow_date
 
     def _save_data(self):
-        data = {
-            "books": {isbn: book.to_dict() for isbn, book in self.books.items()},
-            "members": {member_id: member.to_dict() for member_id, member in self.members.items()}
-        }
-        with open(self.data_file, 'w', encoding='utf-8') as f:
+        # Only reading the records needs the lock; writing the file does not.
+        with self.snapshot_lock():
+            if self.snapshot_format == 'binary':
+                encoded = _BinarySnapshot.encode(self.books, self.members)
+            else:
+                data = {
+                    "books": _record_dicts(self.books),
+                    "members": _record_dicts(self.members)
+                }
+        if self.snapshot_format == 'binary':
+            _BinarySnapshot.write(self.data_file, encoded)
+            return
+        tmp_file = self.data_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=4)
+        os.replace(tmp_file, self.data_file)
+
+    def apply(self, books: dict, members: dict):
+        self._save_data()
+
+    def compact(self):
+        self._save_data()
+
+class JournaledJsonStorage(JsonFileStorage):
+    """JSON snapshot plus an append-only journal of changed records.
+
+    Every change appends one compact JSON line to the journal; the snapshot is
+    only rewritten by compact(), which runs every compact_every records.
+    """
+
+    def __init__(self, data_file: str = 'library_data.json', lazy: bool = False, compact_every: int = 10000,
+                 snapshot_format: str = 'json'):
+        super().__init__(data_file, lazy, snapshot_format)
+        self.journal_file = data_file + '.journal'
+        self.compact_every = compact_every
+        self._journal_handle = None
+        self._journal_records = 0
+
+    def load(self) -> Tuple[MutableMapping, MutableMapping]:
+        super().load()
+        self._replay_journal()
+        return self.books, self.members
+
+    def _replay_journal(self):
+        valid_length = 0
+        try:
+            with open(self.journal_file, 'rb') as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError("record has no line end")
+                        record = json.loads(line)
+                    except ValueError:
+                        # A crash mid-append leaves a partial last line; everything before it is intact.
+                        print("Ignoring incomplete journal record.")
+                        break
+                    for isbn, book_data in record.get('books', {}).items():
+                        if book_data is None:
+                            self.books.pop(isbn, None)
+                        else:
+                            self.books[isbn] = Book.from_dict(book_data)
+                    for member_id, member_data in record.get('members', {}).items():
+                        if member_data is None:
+                            self.members.pop(member_id, None)
+                        else:
+                            self.members[member_id] = Member.from_dict(member_data)
+                    valid_length += len(line)
+                    self._journal_records += 1
+        except FileNotFoundError:
+            return
+        if os.path.getsize(self.journal_file) > valid_length:
+            # Drop the partial line, or the next record appended would be glued onto it.
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(valid_length)
+
+    def apply(self, books: dict, members: dict):
+        record = {}
+        if books:
+            record['books'] = books
+        if members:
+            record['members'] = members
+        if self._journal_handle is None:
+            self._journal_handle = open(self.journal_file, 'a', encoding='utf-8')
+        self._journal_handle.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._journal_handle.flush()
+        self._journal_records += 1
+        if self._journal_records >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Write a fresh snapshot and truncate the journal."""
+        self._save_data()
+        # Records are full-state upserts, so replaying a journal that survived a
+        # crash right after the snapshot was written is harmless.
+        if self._journal_handle is not None:
+            self._journal_handle.close()
+        self._journal_handle = open(self.journal_file, 'w', encoding='utf-8')
+        self._journal_records = 0
+
+    def close(self):
+        if self._journal_handle is not None:
+            self._journal_handle.close()
+            self._journal_handle = None
+
+_MISSING = object()
+
+class _SQLiteRecordMap(MutableMapping):
+    """Dict view of one SQLite table that reads rows on demand and caches the objects built from them."""
+
+    def __init__(self, storage: 'SQLiteStorage', table: str, key_column: str, build):
+        self._storage = storage
+        self._table = table
+        self._key_column = key_column
+        self._build = build
+        self._cache = {}
+        # Keys added (-> record) or deleted (-> None) since apply() last wrote
+        # them. In concurrent mode rows are written by the background flush, so
+        # every read checks these before the table.
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+
+    def __getitem__(self, key):
+        record = self._pending.get(key, _MISSING)
+        if record is None:
+            raise KeyError(key)
+        if record is not _MISSING:
+            return record
+        record = self._cache.get(key)
+        if record is None:
+            record = self._build(key)
+            if record is None:
+                raise KeyError(key)
+            self._cache[key] = record
+        return record
+
+    def __setitem__(self, key, record):
+        with self._pending_lock:
+            self._cache[key] = record
+            self._pending[key] = record
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        with self._pending_lock:
+            self._cache.pop(key, None)
+            self._pending[key] = None
+
+    def _in_table(self, key) -> bool:
+        query = f"SELECT 1 FROM {self._table} WHERE {self._key_column} = ?"
+        return self._storage.conn.execute(query, (key,)).fetchone() is not None
+
+    def __contains__(self, key):
+        record = self._pending.get(key, _MISSING)
+        if record is not _MISSING:
+            return record is not None
+        return key in self._cache or self._in_table(key)
+
+    def __iter__(self):
+        query = f"SELECT {self._key_column} FROM {self._table} ORDER BY rowid"
+        keys = [row[0] for row in self._storage.conn.execute(query)]
+        pending = self.pending()
+        if pending:
+            in_table = set(keys)
+            keys = [key for key in keys if pending.get(key, True) is not None]
+            keys.extend(key for key, record in pending.items() if record is not None and key not in in_table)
+        return iter(keys)
+
+    def __len__(self):
+        count = self._storage.conn.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+        for key, record in self.pending().items():
+            count += (record is not None) - self._in_table(key)
+        return count
+
+    def pending(self) -> dict:
+        """Added and deleted keys not yet written to the table."""
+        with self._pending_lock:
+            return dict(self._pending)
+
+    def settle(self, written: dict):
+        """Forget pending keys that apply() has just written.
+
+        A key changed again since the flush read it (deleted and re-added,
+        say) stays pending until the next flush writes its new state.
+        """
+        with self._pending_lock:
+            for key, data in written.items():
+                record = self._pending.get(key, _MISSING)
+                if record is not _MISSING and (record is None) == (data is None):
+                    del self._pending[key]
+
+    def clear(self):
+        # Only the cache; deleting rows is up to apply().
+        self._cache.clear()
+
+class SQLiteStorage(LibraryStorage):
+    """SQLite database with one row per book, member and loan.
+
+    Rows are read when first accessed, every change is a single transaction
+    touching only the affected rows, and title/author searches run as SQL.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS books (
+            isbn TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            author TEXT NOT NULL,
+            publication_year INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            available_copies INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_books_title ON books (title COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS idx_books_author ON books (author COLLATE NOCASE);
+        CREATE TABLE IF NOT EXISTS members (
+            member_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS loans (
+            member_id TEXT NOT NULL,
+            isbn TEXT NOT NULL,
+            borrow_date TEXT NOT NULL,
+            PRIMARY KEY (member_id, isbn)
+        );
+        CREATE INDEX IF NOT EXISTS idx_loans_isbn ON loans (isbn);
+        CREATE INDEX IF NOT EXISTS idx_loans_borrow_date ON loans (borrow_date);
+    """
+
+    def __init__(self, db_file: str = 'library_data.db'):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # SQLite's lower() and LIKE only fold ASCII; search with Python's
+        # lowercasing so results match the other backends.
+        self.conn.create_function('py_lower', 1, str.lower, deterministic=True)
+        self.conn.executescript(self._SCHEMA)
+        self.books = self.members = None
+
+    def load(self) -> Tuple[MutableMapping, MutableMapping]:
+        self.books = _SQLiteRecordMap(self, 'books', 'isbn', self._build_book)
+        self.members = _SQLiteRecordMap(self, 'members', 'member_id', self._build_member)
+        return self.books, self.members
+
+    def _build_book(self, isbn: str) -> Optional[Book]:
+        row = self.conn.execute(
+            "SELECT title, author, isbn, publication_year, quantity, available_copies FROM books WHERE isbn = ?",
+            (isbn,)).fetchone()
+        if row is None:
+            return None
+        book = Book(*row[:5])
+        book.available_copies = row[5]
+        return book
+
+    def _build_member(self, member_id: str) -> Optional[Member]:
+        row = self.conn.execute(
+            "SELECT member_id, name, email FROM members WHERE member_id = ?", (member_id,)).fetchone()
+        if row is None:
+            return None
+        member = Member(*row)
+        member.borrowed_books = self.conn.execute(
+            "SELECT isbn, borrow_date FROM loans WHERE member_id = ? ORDER BY rowid", (member_id,)).fetchall()
+        return member
+
+    def active_loans(self) -> Iterator[Tuple[str, str, str]]:
+        yield from self.conn.execute("SELECT member_id, isbn, borrow_date FROM loans")
+
+    def apply(self, books: dict, members: dict):
+        with self.conn:
+            for isbn, data in books.items():
+                if data is None:
+                    self.conn.execute("DELETE FROM books WHERE isbn = ?", (isbn,))
+                else:
+                    self.conn.execute(
+                        "INSERT INTO books VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (isbn) DO UPDATE SET "
+                        "title = excluded.title, author = excluded.author, publication_year = excluded.publication_year, "
+                        "quantity = excluded.quantity, available_copies = excluded.available_copies",
+                        (isbn, data['title'], data['author'], data['publication_year'],
+                         data['quantity'], data['available_copies']))
+            for member_id, data in members.items():
+                self.conn.execute("DELETE FROM loans WHERE member_id = ?", (member_id,))
+                if data is None:
+                    self.conn.execute("DELETE FROM members WHERE member_id = ?", (member_id,))
+                    continue
+                self.conn.execute("INSERT INTO members VALUES (?, ?, ?) ON CONFLICT (member_id) DO UPDATE SET "
+                                  "name = excluded.name, email = excluded.email",
+                                  (member_id, data['name'], data['email']))
+                self.conn.executemany("INSERT INTO loans VALUES (?, ?, ?)",
+                                      [(member_id, isbn, borrow_date) for isbn, borrow_date in data['borrowed_books']])
+        if self.books is not None:
+            self.books.settle(books)
+            self.members.settle(members)
+
+    def search(self, query: str, search_by: str, limit: Optional[int], offset: int) -> Optional[List[str]]:
+        needle = query.lower()
+        pending = self.books.pending() if self.books is not None else None
+        if pending:
+            # Books added or removed since the last flush are not in the table
+            # yet: rank the table's matches and the pending ones together.
+            matches = [(isbn, text) for isbn, text in self.conn.execute(
+                f"SELECT isbn, {search_by} FROM books WHERE instr(py_lower({search_by}), ?)", (needle,))
+                if isbn not in pending]
+            matches.extend((isbn, getattr(book, search_by)) for isbn, book in pending.items()
+                           if book is not None and needle in getattr(book, search_by).lower())
+            matches.sort(key=lambda match: (match[1].lower().find(needle), len(match[1]), match[1].lower()))
+            end = None if limit is None else offset + limit
+            return [isbn for isbn, _ in matches[offset:end]]
+        # Same ranking as TrigramIndex: earlier matches, then shorter texts.
+        rows = self.conn.execute(
+            f"SELECT isbn FROM books WHERE instr(py_lower({search_by}), ?1) "
+            f"ORDER BY instr(py_lower({search_by}), ?1), length({search_by}), py_lower({search_by}) "
+            f"LIMIT ?2 OFFSET ?3",
+            (needle, -1 if limit is None else limit, offset))
+        return [row[0] for row in rows]
+
+    def close(self):
+        self.conn.close()
+
+class _LockStripes:
+    """Fixed pool of locks shared out by key hash, so any number of books and
+    members can be locked individually without a lock object per record."""
+
+    def __init__(self, count: int = 1024):
+        self._locks = [threading.Lock() for _ in range(count)]
+
+    def holding(self, keys):
+        return self._holding_stripes(sorted({hash(key) % len(self._locks) for key in keys}))
+
+    def holding_all(self):
+        """Hold every stripe, e.g. while a snapshot reads all books and members."""
+        return self._holding_stripes(range(len(self._locks)))
+
+    @contextlib.contextmanager
+    def _holding_stripes(self, stripes):
+        # Acquire in stripe order so two operations can never deadlock.
+        for stripe in stripes:
+            self._locks[stripe].acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self._locks[stripe].release()
+
+class Library:
+    def __init__(self, data_file: str = 'library_data.json', journal: bool = False, compact_every: int = 10000,
+                 lazy: bool = False, storage: Optional[LibraryStorage] = None, concurrent: bool = False,
+                 flush_interval: float = 0.5, snapshot_format: str = 'json'):
+        if storage is None:
+            if journal:
+                storage = JournaledJsonStorage(data_file, lazy, compact_every, snapshot_format)
+            else:
+                storage = JsonFileStorage(data_file, lazy, snapshot_format)
+        self.storage = storage
+        self.data_file = data_file
+        self._search_indexes = None  # built on first search
+        self._index_lock = threading.Lock()
+        self._due_lock = threading.Lock()
+        self._loan_index_lock = threading.Lock()
+        self._loan_period = LOAN_PERIOD // _MICROSECOND
+        self._load_data()
+        # In concurrent mode each operation locks only the books and members it
+        # touches, and changed keys are written by a background thread every
+        # flush_interval seconds instead of by the calling thread.
+        self.concurrent = concurrent
+        self._locks = _LockStripes() if concurrent else None
+        self._dirty_lock = threading.Lock()
+        self._dirty_books = set()
+        self._dirty_members = set()
+        self._flush_thread = None
+        if concurrent:
+            # Full snapshots must not see a borrow or return half applied.
+            storage.snapshot_lock = self._locks.holding_all
+            self._flush_interval = flush_interval
+            self._stop_flushing = threading.Event()
+            self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flush_thread.start()
+
+    def _locked(self, *keys):
+        if self._locks is None:
+            return contextlib.nullcontext()
+        return self._locks.holding(keys)
+
+    def _load_data(self):
+        self.books, self.members = self.storage.load()
+        # The loan index and due-date heap are built on first use, so a lazy
+        # load does not have to parse every member record at startup.
+        self._loans = None
+
+    def _loan_index(self) -> dict:
+        """Return {isbn: {member_id: borrow timestamp}} for copies currently on loan."""
+        loans = self._loans
+        if loans is None:
+            with self._loan_index_lock:
+                if self._loans is None:
+                    loans = {}
+                    for member_id, isbn, borrow_date in self.storage.active_loans():
+                        loans.setdefault(isbn, {})[member_id] = _to_timestamp(borrow_date)
+                    self._rebuild_due_heap(loans)
+                    self._loans = loans
+                loans = self._loans
+        return loans
+
+    def _rebuild_due_heap(self, loans: dict):
+        # Min-heap of (due_date, member_id, isbn, borrow_date). Returned loans are
+        # left in place and skipped when read; the heap is pruned once they
+        # make up half of it.
+        self._due_heap = [
+            (borrow_date + self._loan_period, member_id, isbn, borrow_date)
+            for isbn, borrowers in loans.items()
+            for member_id, borrow_date in borrowers.items()
+        ]
+        heapq.heapify(self._due_heap)
+        self._stale_due_entries = 0
+
+    def _prune_due_heap(self):
+        # Called with _due_lock held. Only reads the borrow index, so it is safe
+        # while other desks are lending and returning.
+        self._due_heap = [entry for entry in self._due_heap if self._is_active_loan(*entry[1:])]
+        heapq.heapify(self._due_heap)
+        self._stale_due_entries = 0
+
+    def _is_active_loan(self, member_id: str, isbn: str, borrow_date: int) -> bool:
+        return self._loan_index().get(isbn, {}).get(member_id) == borrow_date
+
+    def _save_changes(self, books: Optional[dict] = None, members: Optional[dict] = None):
+        """Persist the given records; a value of None marks the key as deleted."""
+        if self.concurrent:
+            with self._dirty_lock:
+                self._dirty_books.update(books or ())
+                self._dirty_members.update(members or ())
+            return
+        self.storage.apply(
+            {isbn: book.to_dict() if book else None for isbn, book in (books or {}).items()},
+            {member_id: member.to_dict() if member else None for member_id, member in (members or {}).items()})
+
+    def _flush_loop(self):
+        while not self._stop_flushing.wait(self._flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write every book and member changed since the last flush in one batch.
+
+        Records are read at flush time under their locks, so a key changed
+        many times between flushes is written once, in its latest state.
+        """
+        if not self.concurrent:
+            return
+        with self._dirty_lock:
+            dirty_books, self._dirty_books = self._dirty_books, set()
+            dirty_members, self._dirty_members = self._dirty_members, set()
+        if not dirty_books and not dirty_members:
+            return
+        # Read every dirty record under one set of locks, so a borrow or return
+        # is either wholly in this batch (book and member) or wholly in the next.
+        keys = [('book', isbn) for isbn in dirty_books] + [('member', member_id) for member_id in dirty_members]
+        with self._locked(*keys):
+            books = {}
+            for isbn in dirty_books:
+                book = self.books.get(isbn)
+                books[isbn] = book.to_dict() if book else None
+            members = {}
+            for member_id in dirty_members:
+                member = self.members.get(member_id)
+                members[member_id] = member.to_dict() if member else None
+        try:
+            self.storage.apply(books, members)
+        except Exception as e:
+            print(f"Error saving library data: {e}. Will retry.")
+            with self._dirty_lock:
+                self._dirty_books |= dirty_books
+                self._dirty_members |= dirty_members
+
+    def compact(self):
+        """Write a fresh snapshot of the library (and truncate the journal, if any)."""
+        self.flush()
+        self.storage.compact()
+
+    def close(self):
+        if self._flush_thread is not None:
+            self._stop_flushing.set()
+            self._flush_thread.join()
+            self._flush_thread = None
+        self.flush()
+        self.storage.close()
+
+    def _get_search_indexes(self) -> dict:
+        # Called with _index_lock held.
+        if self._search_indexes is None:
+            indexes = {'title': TrigramIndex(), 'author': TrigramIndex()}
+            for book in self.books.values():
+                indexes['title'].add(book.isbn, book.title)
+                indexes['author'].add(book.isbn, book.author)
+            self._search_indexes = indexes
+        return self._search_indexes
+
+    def _index_book(self, book: Book):
+        with self._index_lock:
+            if self._search_indexes is not None:
+                self._search_indexes['title'].add(book.isbn, book.title)
+                self._search_indexes['author'].add(book.isbn, book.author)
+
+    def _unindex_book(self, isbn: str):
+        with self._index_lock:
+            if self._search_indexes is not None:
+                self._search_indexes['title'].remove(isbn)
+                self._search_indexes['author'].remove(isbn)
 
     def add_book(self, book: Book) -> bool:
-        if book.isbn in self.books:
-            print(f"Book with ISBN {book.isbn} already exists. Updating quantity.")
-            self.books[book.isbn].quantity += book.quantity
-            self.books[book.isbn].available_copies += book.quantity
-            self._save_data()
+        with self._locked(('book', book.isbn)):
+            if book.isbn in self.books:
+                print(f"Book with ISBN {book.isbn} already exists. Updating quantity.")
+                self.books[book.isbn].quantity += book.quantity
+                self.books[book.isbn].available_copies += book.quantity
+                self._save_changes(books={book.isbn: self.books[book.isbn]})
+                return True
+            self.books[book.isbn] = book
+            self._index_book(book)
+            self._save_changes(books={book.isbn: book})
+            print(f"Book '{book.title}' added to the library.")
             return True
-        self.books[book.isbn] = book
-        self._save_data()
-        print(f"Book '{book.title}' added to the library.")
-        return True
 
     def remove_book(self, isbn: str) -> bool:
-        if isbn not in self.books:
-            print(f"Book with ISBN {isbn} not found.")
-            return False
-        if any(isbn == borrowed_isbn for member in self.members.values() for borrowed_isbn, _ in member.borrowed_books):
-            print(f"Cannot remove book {isbn}. It is currently borrowed by one or more members.")
-            return False
-        del self.books[isbn]
-        self._save_data()
-        print(f"Book with ISBN {isbn} removed from the library.")
-        return True
+        with self._locked(('book', isbn)):
+            if isbn not in self.books:
+                print(f"Book with ISBN {isbn} not found.")
+                return False
+            if self._loan_index().get(isbn):
+                print(f"Cannot remove book {isbn}. It is currently borrowed by one or more members.")
+                return False
+            del self.books[isbn]
+            self._unindex_book(isbn)
+            self._save_changes(books={isbn: None})
+            print(f"Book with ISBN {isbn} removed from the library.")
+            return True
+
+    def bulk_add_books(self, books: Iterable) -> int:
+        """Add many books at once and persist them in a single write.
+
+        Items are Book objects or dicts with the Book fields (e.g. CSV rows).
+        Quantities of repeated ISBNs are merged; invalid rows are skipped and
+        reported. Returns the number of rows accepted.
+        """
+        changed = {}
+        rejected = []
+        added = merged = 0
+        for row_number, item in enumerate(books, 1):
+            try:
+                if isinstance(item, Book):
+                    book = item
+                else:
+                    book = Book(item['title'], item['author'], item['isbn'],
+                                int(item['publication_year']), int(item['quantity']))
+            except KeyError as e:
+                rejected.append((row_number, f"Missing field {e}."))
+                continue
+            except (TypeError, ValueError) as e:
+                rejected.append((row_number, e))
+                continue
+            with self._locked(('book', book.isbn)):
+                existing = self.books.get(book.isbn)
+                if existing is None:
+                    self.books[book.isbn] = book
+                    self._index_book(book)
+                    changed[book.isbn] = book
+                    added += 1
+                else:
+                    existing.quantity += book.quantity
+                    existing.available_copies += book.quantity
+                    changed[book.isbn] = existing
+                    merged += 1
+        if changed:
+            self._save_changes(books=changed)
+        print(f"Imported {added} new books, merged {merged} rows into existing ISBNs, rejected {len(rejected)} rows.")
+        for row_number, error in rejected[:10]:
+            print(f"  Row {row_number}: {error}")
+        return added + merged
+
+    def import_books_csv(self, csv_file: str) -> int:
+        """Bulk-add books from a CSV file with title, author, isbn, publication_year and quantity columns."""
+        with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+            return self.bulk_add_books(csv.DictReader(f))
+
+    def bulk_register_members(self, members: Iterable) -> int:
+        """Register many members at once and persist them in a single write.
+
+        Items are Member objects or dicts with member_id, name and email.
+        Invalid rows and already registered IDs are skipped and reported.
+        Returns the number of members registered.
+        """
+        changed = {}
+        rejected = []
+        for row_number, item in enumerate(members, 1):
+            try:
+                member = item if isinstance(item, Member) else Member(item['member_id'], item['name'], item['email'])
+            except KeyError as e:
+                rejected.append((row_number, f"Missing field {e}."))
+                continue
+            except (TypeError, ValueError) as e:
+                rejected.append((row_number, e))
+                continue
+            with self._locked(('member', member.member_id)):
+                if member.member_id in changed or member.member_id in self.members:
+                    rejected.append((row_number, f"Member with ID {member.member_id} already registered."))
+                    continue
+                self.members[member.member_id] = member
+                changed[member.member_id] = member
+        if changed:
+            self._save_changes(members=changed)
+        print(f"Registered {len(changed)} members, rejected {len(rejected)} rows.")
+        for row_number, error in rejected[:10]:
+            print(f"  Row {row_number}: {error}")
+        return len(changed)
 
     def register_member(self, member: Member) -> bool:
-        if member.member_id in self.members:
-            print(f"Member with ID {member.member_id} already registered.")
-            return False
-        self.members[member.member_id] = member
-        self._save_data()
-        print(f"Member '{member.name}' registered successfully.")
-        return True
+        with self._locked(('member', member.member_id)):
+            if member.member_id in self.members:
+                print(f"Member with ID {member.member_id} already registered.")
+                return False
+            self.members[member.member_id] = member
+            self._save_changes(members={member.member_id: member})
+            print(f"Member '{member.name}' registered successfully.")
+            return True
 
     def unregister_member(self, member_id: str) -> bool:
-        if member_id not in self.members:
-            print(f"Member with ID {member_id} not found.")
-            return False
-        if self.members[member_id].borrowed_books:
-            print(f"Cannot unregister member {member_id}. They still have borrowed books.")
-            return False
-        del self.members[member_id]
-        self._save_data()
-        print(f"Member with ID {member_id} unregistered.")
-        return True
+        with self._locked(('member', member_id)):
+            if member_id not in self.members:
+                print(f"Member with ID {member_id} not found.")
+                return False
+            if self.members[member_id].loans:
+                print(f"Cannot unregister member {member_id}. They still have borrowed books.")
+                return False
+            del self.members[member_id]
+            self._save_changes(members={member_id: None})
+            print(f"Member with ID {member_id} unregistered.")
+            return True
 
     def borrow_book(self, isbn: str, member_id: str) -> bool:
-        book = self.books.get(isbn)
-        member = self.members.get(member_id)
+        with self._locked(('book', isbn), ('member', member_id)):
+            book = self.books.get(isbn)
+            member = self.members.get(member_id)
 
-        if not book:
-            print(f"Book with ISBN {isbn} not found.")
-            return False
-        if not member:
-            print(f"Member with ID {member_id} not found.")
-            return False
-        if book.available_copies <= 0:
-            print(f"No available copies of '{book.title}'.")
-            return False
-        if any(isbn == borrowed_isbn for borrowed_isbn, _ in member.borrowed_books):
-            print(f"Member {member.name} has already borrowed '{book.title}'.")
-            return False
+            if not book:
+                print(f"Book with ISBN {isbn} not found.")
+                return False
+            if not member:
+                print(f"Member with ID {member_id} not found.")
+                return False
+            if book.available_copies <= 0:
+                print(f"No available copies of '{book.title}'.")
+                return False
+            if isbn in member.loans:
+                print(f"Member {member.name} has already borrowed '{book.title}'.")
+                return False
 
-        book.available_copies -= 1
-        member.borrowed_books.append((isbn, datetime.now().isoformat()))
-        self._save_data()
-        print(f"'{book.title}' borrowed by {member.name} successfully.")
-        return True
+            borrow_date = _to_timestamp(datetime.now())
+            self._apply_loan(book, member, borrow_date)
+            try:
+                self._save_changes(books={isbn: book}, members={member_id: member})
+            except Exception:
+                self._apply_return(book, member)
+                raise
+            print(f"'{book.title}' borrowed by {member.name} successfully.")
+            return True
 
     def return_book(self, isbn: str, member_id: str) -> bool:
-        book = self.books.get(isbn)
-        member = self.members.get(member_id)
+        with self._locked(('book', isbn), ('member', member_id)):
+            book = self.books.get(isbn)
+            member = self.members.get(member_id)
 
-        if not book:
-            print(f"Book with ISBN {isbn} not found.")
-            return False
-        if not member:
-            print(f"Member with ID {member_id} not found.")
-            return False
+            if not book:
+                print(f"Book with ISBN {isbn} not found.")
+                return False
+            if not member:
+                print(f"Member with ID {member_id} not found.")
+                return False
 
-        try:
-            # Find and remove the specific borrowed book entry
-            borrowed_entry_index = -1
-            for i, (borrowed_isbn, _) in enumerate(member.borrowed_books):
-                if borrowed_isbn == isbn:
-                    borrowed_entry_index = i
-                    break
-            
-            if borrowed_entry_index == -1:
+            borrow_date = member.loans.get(isbn)
+            if borrow_date is None:
                 print(f"Member {member.name} did not borrow '{book.title}'.")
                 return False
 
-            member.borrowed_books.pop(borrowed_entry_index)
-            book.available_copies += 1
-            self._save_data()
+            self._apply_return(book, member)
+            try:
+                self._save_changes(books={isbn: book}, members={member_id: member})
+            except Exception:
+                self._apply_loan(book, member, borrow_date)
+                raise
             print(f"'{book.title}' returned by {member.name} successfully.")
             return True
-        except ValueError:
-            print(f"Member {member.name} did not borrow '{book.title}'.")
-            return False
 
-    def search_book(self, query: str, search_by: str = 'title') -> List[Book]:
-        results = []
-        query_lower = query.lower()
-        for book in self.books.values():
-            if search_by == 'title' and query_lower in book.title.lower():
-                results.append(book)
-            elif search_by == 'author' and query_lower in book.author.lower():
-                results.append(book)
-            elif search_by == 'isbn' and query_lower == book.isbn.lower():
-                results.append(book)
-        return results
+    def _apply_loan(self, book: Book, member: Member, borrow_date: int):
+        # Build the index before touching member.loans, which it is built from.
+        loans = self._loan_index()
+        book.available_copies -= 1
+        member.loans[book.isbn] = borrow_date
+        loans.setdefault(book.isbn, {})[member.member_id] = borrow_date
+        with self._due_lock:
+            heapq.heappush(self._due_heap, (borrow_date + self._loan_period, member.member_id, book.isbn, borrow_date))
+
+    def _apply_return(self, book: Book, member: Member):
+        loans = self._loan_index()
+        book.available_copies += 1
+        del member.loans[book.isbn]
+        borrowers = loans.get(book.isbn)
+        if borrowers is not None:
+            borrowers.pop(member.member_id, None)
+            if not borrowers:
+                del loans[book.isbn]
+        with self._due_lock:
+            self._stale_due_entries += 1
+            if self._stale_due_entries * 2 > len(self._due_heap):
+                self._prune_due_heap()
+
+    def overdue_loans(self, as_of: Optional[datetime] = None) -> List[Tuple[datetime, str, str]]:
+        """Return (due_date, member_id, isbn) for loans due before as_of, oldest first.
+
+        Only the part of the due-date heap that is actually overdue is visited,
+        so the cost is O(k log k) for k overdue loans, whatever the total.
+        """
+        as_of = _to_timestamp(as_of or datetime.now())
+        self._loan_index()  # builds the due-date heap on first use
+        overdue = []
+        with self._due_lock:
+            heap = self._due_heap
+            frontier = [(heap[0], 0)] if heap else []
+            while frontier:
+                (due, member_id, isbn, borrow_date), i = heapq.heappop(frontier)
+                if due > as_of:
+                    break
+                if self._is_active_loan(member_id, isbn, borrow_date):
+                    overdue.append((_from_timestamp(due), member_id, isbn))
+                for child in (2 * i + 1, 2 * i + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child], child))
+        return overdue
+
+    def list_overdue_loans(self):
+        overdue = self.overdue_loans()
+        if not overdue:
+            print("No overdue loans.")
+            return
+        print("\n--- Overdue Loans ---")
+        for due, member_id, isbn in overdue:
+            book_title = self.books[isbn].title if isbn in self.books else "Unknown Book"
+            print(f"'{book_title}' (ISBN: {isbn}) borrowed by member {member_id}, due {due.strftime('%Y-%m-%d')}")
+        print("---------------------")
+
+    def search_book(self, query: str, search_by: str = 'title', limit: Optional[int] = None, offset: int = 0) -> List[Book]:
+        """Substring search over title or author (ranked), or exact ISBN lookup.
+
+        Use offset/limit to page through the ranked results.
+        """
+        if search_by == 'isbn':
+            for candidate in (query, query.upper(), query.lower()):
+                if candidate in self.books:
+                    return [self.books[candidate]] if offset == 0 and limit != 0 else []
+            return []
+        if search_by not in ('title', 'author'):
+            return []
+        isbns = self.storage.search(query, search_by, limit, offset)
+        if isbns is not None:
+            return [self.books[isbn] for isbn in isbns]
+        end = None if limit is None else offset + limit
+        with self._index_lock:
+            isbns = self._get_search_indexes()[search_by].search(query, end)
+        return [self.books[isbn] for isbn in isbns[offset:end]]
 
     def list_all_books(self):
         if not self.books:
@@ -250,7 +1338,8 @@ def main():
         print("7. Search Books")
         print("8. List All Books")
         print("9. List All Members")
-        print("10. Exit")
+        print("10. List Overdue Loans")
+        print("11. Exit")
 
         choice = get_valid_input("Enter your choice: ", int)
 
@@ -316,11 +1405,15 @@ def main():
             library.list_all_members()
 
         elif choice == 10:
+            library.list_overdue_loans()
+
+        elif choice == 11:
+            library.close()
             print("Exiting Library Management System. Goodbye!")
             break
 
         else:
-            print("Invalid choice. Please enter a number between 1 and 10.")
+            print("Invalid choice. Please enter a number between 1 and 11.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file